@@ -0,0 +1,159 @@
+"""
+In-memory audio shared between the backend stages.
+
+An ``AudioBuffer`` is a float32 NumPy array plus its sample rate. Slices and
+segments are views of the same memory, so stages can hand audio to each other
+without writing files or re-decoding; encoding happens only when the result is
+written out. ``iter_blocks`` and ``peak`` read files block by block so long
+recordings are never held whole.
+"""
+import numpy as np
+import soundfile as sf
+
+import encoder
+
+# Block length for streamed reads; a 10 s float32 stereo block at 48 kHz is under 4 MB
+BLOCK_SECONDS = 10
+
+
+class AudioBuffer:
+    """
+    Float32 samples in [-1, 1] with their sample rate.
+
+    ``samples`` is 1-D for mono or ``(frames, channels)`` for multichannel
+    audio, matching soundfile's layout.
+    """
+
+    __slots__ = ("samples", "sr")
+
+    def __init__(self, samples, sr):
+        # asarray only copies when the input is not float32 already
+        self.samples = np.asarray(samples, dtype=np.float32)
+        self.sr = int(sr)
+
+    @classmethod
+    def from_file(cls, path, mono=True):
+        """
+        Decodes an audio file once.
+
+        soundfile handles wav/flac/ogg/mp3 directly; other containers (aac,
+        m4a, ...) are decoded through pydub.
+        """
+        try:
+            samples, sr = sf.read(path, dtype="float32", always_2d=False)
+        except sf.LibsndfileError:
+            from pydub import AudioSegment
+
+            return cls.from_segment(AudioSegment.from_file(path), mono=mono)
+        buffer = cls(samples, sr)
+        return buffer.mono() if mono else buffer
+
+    @classmethod
+    def from_segment(cls, segment, mono=False):
+        """Wraps a pydub ``AudioSegment``."""
+        samples = np.array(segment.get_array_of_samples(), dtype=np.float32)
+        samples /= float(1 << (8 * segment.sample_width - 1))
+        if segment.channels > 1:
+            samples = samples.reshape(-1, segment.channels)
+        buffer = cls(samples, segment.frame_rate)
+        return buffer.mono() if mono else buffer
+
+    @classmethod
+    def concat(cls, buffers):
+        """Joins buffers of the same rate end to end (one copy)."""
+        buffers = list(buffers)
+        if not buffers:
+            raise ValueError("Nothing to concatenate")
+        sr = buffers[0].sr
+        if any(buffer.sr != sr for buffer in buffers):
+            raise ValueError("Cannot concatenate buffers with different sample rates")
+        return cls(np.concatenate([buffer.samples for buffer in buffers]), sr)
+
+    @property
+    def channels(self):
+        return 1 if self.samples.ndim == 1 else self.samples.shape[1]
+
+    @property
+    def duration(self):
+        return len(self) / self.sr
+
+    def __len__(self):
+        return self.samples.shape[0]
+
+    def __getitem__(self, index):
+        """Slices by frame index; slices are views, never copies."""
+        if not isinstance(index, slice):
+            raise TypeError("AudioBuffer only supports slicing")
+        return AudioBuffer(self.samples[index], self.sr)
+
+    def __repr__(self):
+        return f"AudioBuffer({len(self)} frames, {self.channels} ch, {self.sr} Hz)"
+
+    def segments(self, spans):
+        """Views for a list of ``(start, end)`` frame spans, e.g. VAD timestamps."""
+        return [self[start:end] for start, end in spans]
+
+    def mono(self):
+        """Downmixes to mono; mono buffers are returned as they are."""
+        if self.samples.ndim == 1:
+            return self
+        return AudioBuffer(self.samples.mean(axis=1), self.sr)
+
+    def copy(self):
+        """Detached copy, e.g. to keep a short slice without pinning its whole parent block."""
+        return AudioBuffer(self.samples.copy(), self.sr)
+
+    def with_samples(self, samples):
+        """New buffer at the same rate, e.g. for the output of an effect."""
+        return AudioBuffer(samples, self.sr)
+
+    def write(self, path, fmt=None):
+        """Encodes to ``path``; the format defaults to the file extension."""
+        return encoder.write(self.samples, self.sr, path, fmt=fmt)
+
+
+def iter_blocks(path, block_seconds=BLOCK_SECONDS, mono=True, max_seconds=None):
+    """
+    Reads an audio file block by block, so peak memory does not grow with its length.
+
+    soundfile-readable files (wav/flac/ogg/mp3) are read ``block_seconds`` at
+    a time and never held whole; other containers are decoded through pydub
+    and then sliced.
+
+    Args:
+        path (str): Audio file.
+        block_seconds (float): Length of each block.
+        mono (bool): Downmix each block to mono.
+        max_seconds (float): Stop after this much audio; None reads everything.
+
+    Yields:
+        AudioBuffer: Consecutive blocks in file order.
+    """
+    try:
+        f = sf.SoundFile(path)
+    except sf.LibsndfileError:
+        audio = AudioBuffer.from_file(path, mono=mono)
+        block_frames = max(1, int(block_seconds * audio.sr))
+        end = len(audio) if max_seconds is None else min(len(audio), int(max_seconds * audio.sr))
+        for start in range(0, end, block_frames):
+            yield audio[start:min(start + block_frames, end)]
+        return
+
+    with f:
+        block_frames = max(1, int(block_seconds * f.samplerate))
+        remaining = None if max_seconds is None else int(max_seconds * f.samplerate)
+        while remaining is None or remaining > 0:
+            frames = block_frames if remaining is None else min(block_frames, remaining)
+            samples = f.read(frames, dtype="float32", always_2d=False)
+            if not len(samples):
+                return
+            if remaining is not None:
+                remaining -= len(samples)
+            block = AudioBuffer(samples, f.samplerate)
+            yield block.mono() if mono else block
+
+
+def peak(path, block_seconds=BLOCK_SECONDS, mono=True):
+    """Absolute sample peak of a file (of its mono mix by default), computed block by block."""
+    return max((float(np.max(np.abs(block.samples))) for block in iter_blocks(path, block_seconds, mono=mono)
+                if len(block)), default=0.0)
@@ -0,0 +1,70 @@
+"""
+Load test for the async job API in test.py.
+
+Start the server against the offline stub, then run the load test from ``backend/``:
+
+    TTS_BACKEND=stub python test.py
+    python -m benchmarks.load_jobs uploads/db.mp3 --clients 50 --requests 200
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def run_one(base_url, sample_path, poll_interval):
+    start = time.perf_counter()
+    with open(sample_path, "rb") as f:
+        response = requests.post(
+            f"{base_url}/api/jobs",
+            files={"sample_file": f},
+            data={"voice_name": "load-test", "message": "Load testing the job queue.", "output_format": "wav"},
+            timeout=30,
+        )
+    accepted = time.perf_counter() - start
+    if response.status_code == 429:
+        return "rejected", accepted, None
+    response.raise_for_status()
+
+    status_url = f"{base_url}{response.json()['status_url']}"
+    while True:
+        job = requests.get(status_url, timeout=30).json()
+        if job["status"] in ("done", "failed"):
+            return job["status"], accepted, time.perf_counter() - start
+        time.sleep(poll_interval)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sample", help="Audio sample to upload")
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--clients", type=int, default=20, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=100, help="Total jobs to submit")
+    parser.add_argument("--poll-interval", type=float, default=0.2)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        results = list(pool.map(lambda _: run_one(args.url, args.sample, args.poll_interval), range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    accept_times = [accepted * 1000 for _, accepted, _ in results]
+    completed = [total for status, _, total in results if status == "done"]
+    counts = {status: sum(1 for s, _, _ in results if s == status) for status in ("done", "failed", "rejected")}
+
+    print(f"{args.requests} jobs from {args.clients} clients in {elapsed:.1f}s: {counts}")
+    print(f"POST latency   p50={percentile(accept_times, 50):.0f} ms  p95={percentile(accept_times, 95):.0f} ms")
+    if completed:
+        print(f"Job completion p50={percentile(completed, 50):.2f} s  p95={percentile(completed, 95):.2f} s  "
+              f"mean={statistics.mean(completed):.2f} s  throughput={len(completed) / elapsed:.2f} jobs/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Speed/quality comparison of fp32 vs. dynamic int8 XTTS inference on CPU.
+
+Reports the real-time factor (synthesis time / audio duration) of each mode and
+a mel-cepstral distance between the fp32 and int8 renderings of the same text,
+aligned with DTW since the two runs can differ slightly in length. Run from
+``backend/``:
+
+    python -m benchmarks.quantization uploads/db.mp3 --threads 8 --json quant.json
+"""
+import argparse
+import json
+import time
+
+import librosa
+import numpy as np
+import torch
+
+import xtts_utils
+from model_loader import XTTS_MODEL_PATH, load_xtts, quantize_int8
+
+TEXTS = {
+    "en": [
+        "The quick brown fox jumps over the lazy dog.",
+        "Real-time factor is what decides how many voices one node can serve at once.",
+    ],
+    "hi": [
+        "आज मैं बहुत थक गया हूँ और घर जाना चाहता हूँ।",
+        "सकारात्मक सोच से जीवन में बड़े बदलाव आते हैं।",
+    ],
+}
+
+
+def render(tts_model, texts, language, latents, seed):
+    outputs, elapsed, audio_seconds = [], 0.0, 0.0
+    for text in texts:
+        # Same seed per text in both modes so sampling differences come from the weights only
+        torch.manual_seed(seed)
+        start = time.perf_counter()
+        wav, sr = xtts_utils.synthesize(tts_model, text, language, *latents)
+        elapsed += time.perf_counter() - start
+        audio_seconds += len(wav) / sr
+        outputs.append((wav, sr))
+    return outputs, elapsed / audio_seconds
+
+
+def mel_cepstral_distance(reference, candidate, sr):
+    ref_mfcc = librosa.feature.mfcc(y=reference, sr=sr, n_mfcc=13)[1:]
+    cand_mfcc = librosa.feature.mfcc(y=candidate, sr=sr, n_mfcc=13)[1:]
+    _, path = librosa.sequence.dtw(X=ref_mfcc, Y=cand_mfcc, metric="euclidean")
+    diffs = ref_mfcc[:, path[:, 0]] - cand_mfcc[:, path[:, 1]]
+    # Standard MCD scaling to dB
+    return float((10.0 / np.log(10)) * np.sqrt(2) * np.mean(np.sqrt(np.sum(diffs ** 2, axis=0))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("speaker_wav", help="Reference speaker audio")
+    parser.add_argument("--language", default="en", choices=sorted(TEXTS))
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads (0 = default)")
+    parser.add_argument("--model-path", default=XTTS_MODEL_PATH)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    texts = TEXTS[args.language]
+    tts_model = load_xtts("cpu", model_path=args.model_path, num_threads=args.threads)
+    latents = xtts_utils.compute_conditioning(tts_model, [args.speaker_wav])
+
+    xtts_utils.warmup(tts_model)
+    fp32_outputs, fp32_rtf = render(tts_model, texts, args.language, latents, args.seed)
+
+    # Conditioning stays the fp32 one so only synthesis is compared
+    quantize_int8(tts_model)
+    xtts_utils.warmup(tts_model)
+    int8_outputs, int8_rtf = render(tts_model, texts, args.language, latents, args.seed)
+
+    distances = [
+        mel_cepstral_distance(ref, cand, sr) for (ref, sr), (cand, _) in zip(fp32_outputs, int8_outputs)
+    ]
+    results = {
+        "language": args.language,
+        "threads": torch.get_num_threads(),
+        "fp32_rtf": fp32_rtf,
+        "int8_rtf": int8_rtf,
+        "speedup": fp32_rtf / int8_rtf,
+        "mcd_db": distances,
+        "mean_mcd_db": float(np.mean(distances)),
+    }
+
+    print(f"threads={results['threads']}  fp32 RTF={fp32_rtf:.3f}  int8 RTF={int8_rtf:.3f}  "
+          f"speedup={results['speedup']:.2f}x  mean MCD={results['mean_mcd_db']:.2f} dB")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
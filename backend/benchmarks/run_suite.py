@@ -0,0 +1,346 @@
+"""
+Offline benchmark suite for the synthesis and post-processing paths.
+
+Covers reference preprocessing, each emotion effect, end-to-end
+``VoiceCloner.clone_voice`` and format conversion across clip lengths and
+emotions. Synthesis uses the stub model in ``benchmarks/stub_model.py``, so
+nothing is downloaded; ``--rtf`` gives it an artificial model cost. Every
+measurement reports median/p95 latency, real-time factor where audio is
+produced, throughput and the peak RSS reached while that measurement ran
+(Linux; elsewhere only the whole-run peak is reported). Run from ``backend/``:
+
+    python -m benchmarks.run_suite --json results.json
+    python -m benchmarks.run_suite --stages effects conversion --baseline results.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import soundfile as sf
+
+import effects
+import preprocessing
+
+CLIP_SECONDS = [2, 10, 30]
+REFERENCE_SECONDS = [5, 15, 30]
+EMOTIONS = [None, "neutral", "excited", "sad", "angry", "hesitant"]
+CONVERSION_FORMATS = ["wav", "flac", "ogg", "mp3"]
+STAGES = ["preprocessing", "effects", "end_to_end", "conversion"]
+
+SENTENCE = "सकारात्मक सोच से जीवन में बड़े बदलाव आते हैं।"
+TEXTS = {
+    "short": SENTENCE,
+    "medium": " ".join([SENTENCE] * 4),
+    # Long enough to take the long-form path
+    "long": " ".join([SENTENCE] * 12),
+}
+
+
+def peak_rss_mb():
+    # ru_maxrss is the lifetime peak, in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _proc_status_mb(field):
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss():
+    """
+    Restarts the kernel's peak RSS counter (VmHWM) so the next reading covers
+    only what runs from here on. Returns the current RSS in MB, or None where
+    the counter cannot be reset (non-Linux).
+    """
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+    except OSError:
+        return None
+    return _proc_status_mb("VmRSS")
+
+
+# RSS when the current measurement started; None when peaks cannot be scoped to one measurement
+_rss_before_mb = None
+
+
+def measure(fn, runs, warmup=1):
+    global _rss_before_mb
+    # summarize() right after reads the peak of this measurement alone
+    _rss_before_mb = reset_peak_rss()
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def summarize(stage, name, params, timings, audio_seconds=None):
+    median = statistics.median(timings)
+    ordered = sorted(timings)
+    result = {
+        "stage": stage,
+        "name": name,
+        "params": params,
+        "runs": len(timings),
+        "median_ms": median * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))] * 1000,
+        "min_ms": ordered[0] * 1000,
+        "throughput_per_s": 1.0 / median if median else None,
+    }
+    peak = _proc_status_mb("VmHWM") if _rss_before_mb is not None else None
+    if peak is not None:
+        result["peak_rss_mb"] = peak
+        result["rss_growth_mb"] = peak - _rss_before_mb
+    if audio_seconds:
+        result["audio_seconds"] = audio_seconds
+        result["rtf"] = median / audio_seconds
+    return result
+
+
+def synthetic_voice(seconds, sr, seed=0):
+    # Speech-like bursts separated by pauses, over a little background noise
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    voice = (0.3 * np.sin(2 * np.pi * 140 * t) + 0.1 * np.sin(2 * np.pi * 280 * t)) * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t))
+    gate = (np.sin(2 * np.pi * 0.4 * t) > -0.3).astype(np.float64)
+    return (voice * gate + 0.01 * rng.standard_normal(len(t))).astype(np.float32)
+
+
+def make_cloner(args, workdir):
+    from benchmarks.stub_model import StubXtts
+    from emotion import VoiceCloner
+
+    # Output and phrase caches off, so repeated runs measure synthesis
+    return VoiceCloner(
+        speaker_cache_dir=os.path.join(workdir, "speaker_cache"),
+        output_cache_dir=None,
+        phrase_cache_dir=None,
+        tts_model=StubXtts(rtf=args.rtf),
+    )
+
+
+def bench_preprocessing(args, workdir, cloner):
+    results = []
+    sr = 22050
+    for seconds in REFERENCE_SECONDS:
+        audio = synthetic_voice(seconds, sr)
+        path = os.path.join(workdir, f"reference_{seconds}s.wav")
+        sf.write(path, audio, sr)
+        params = {"seconds": seconds}
+
+        timings = measure(lambda: preprocessing.load_mono(path), args.runs)
+        results.append(summarize("preprocessing", "decode", params, timings, seconds))
+
+        timings = measure(lambda: preprocessing.spectral_gate(preprocessing.normalize(audio), sr), args.runs)
+        results.append(summarize("preprocessing", "spectral_gate", params, timings, seconds))
+
+        timings = measure(lambda: preprocessing.trim_silence(audio, sr), args.runs)
+        results.append(summarize("preprocessing", "trim_silence", params, timings, seconds))
+
+        timings = measure(lambda: cloner.preprocess_audio(path), args.runs)
+        results.append(summarize("preprocessing", "vad_preprocess", params, timings, seconds))
+    return results
+
+
+def bench_effects(args):
+    from emotion import EMOTION_PITCH, EMOTION_REVERB
+
+    results = []
+    sr = 24000
+    for seconds in CLIP_SECONDS:
+        audio = synthetic_voice(seconds, sr)
+        for emotion in EMOTIONS:
+            params = {"seconds": seconds, "emotion": emotion}
+            semitones = EMOTION_PITCH.get(emotion, 0)
+            intensity = EMOTION_REVERB.get(emotion, 0)
+
+            stages = {
+                "pitch_shift": lambda: effects.pitch_shift(audio, semitones),
+                "reverb": lambda: effects.apply_reverb(audio, intensity),
+                "dynamic_volume": lambda: effects.add_dynamic_volume(audio, sr, emotion),
+                "all_effects": lambda: effects.apply_emotion_effects(audio, sr, semitones, intensity, emotion),
+            }
+            for name, fn in stages.items():
+                results.append(summarize("effects", name, params, measure(fn, args.runs), seconds))
+    return results
+
+
+def bench_end_to_end(args, workdir, cloner):
+    results = []
+    speaker_wav = os.path.join(workdir, "speaker.wav")
+    sf.write(speaker_wav, synthetic_voice(10, 22050, seed=1), 22050)
+    output_wav = os.path.join(workdir, "clone.wav")
+
+    # Conditioning is computed once up front, as it would be for a returning speaker
+    cloner.get_speaker_latents(speaker_wav)
+
+    for length, text in TEXTS.items():
+        for emotion in EMOTIONS:
+            # add_pauses draws random commas; reseed so every run synthesizes the same text
+            def clone():
+                np.random.seed(args.seed)
+                if not cloner.clone_voice(text, speaker_wav, output_wav, language="hi", emotion=emotion):
+                    raise RuntimeError("clone_voice failed")
+
+            timings = measure(clone, args.runs)
+            params = {"text": length, "chars": len(text), "emotion": emotion}
+            results.append(summarize("end_to_end", "clone_voice", params, timings, sf.info(output_wav).duration))
+
+    # Stock opening and sign-off around one new sentence per run, with the phrase cache on
+    from phrase_cache import PhraseCache
+
+    cloner.phrase_cache = PhraseCache(cache_dir=None)
+    runs = iter(range(1_000_000))
+
+    def clone_boilerplate():
+        text = f"{TEXTS['medium']} आज का विषय संख्या {next(runs)} है। {TEXTS['medium']}"
+        if not cloner.clone_voice(text, speaker_wav, output_wav, language="hi"):
+            raise RuntimeError("clone_voice failed")
+
+    try:
+        timings = measure(clone_boilerplate, args.runs)
+    finally:
+        cloner.phrase_cache = None
+    params = {"text": "boilerplate", "phrase_cache": True}
+    results.append(summarize("end_to_end", "clone_voice", params, timings, sf.info(output_wav).duration))
+    return results
+
+
+def bench_conversion(args, workdir):
+    import encoder
+    from output import convert_audio
+
+    results = []
+    for seconds in CLIP_SECONDS:
+        audio = synthetic_voice(seconds, 24000)
+        source = os.path.join(workdir, f"clip_{seconds}s.wav")
+        sf.write(source, audio, 24000)
+        for fmt in CONVERSION_FORMATS:
+            output_dir = os.path.join(workdir, f"converted_{fmt}")
+            params = {"seconds": seconds, "format": fmt}
+
+            # Direct encode from the in-memory waveform, as the synthesis path now does
+            target = os.path.join(workdir, f"encoded_{seconds}s.{fmt}")
+            timings = measure(lambda: encoder.write(audio, 24000, target), args.runs)
+            results.append(summarize("conversion", "encode", params, timings, seconds))
+
+            try:
+                timings = measure(lambda: convert_audio(source, fmt, output_dir), args.runs)
+            except Exception as e:
+                # Encoders other than WAV need ffmpeg on the PATH
+                results.append({"stage": "conversion", "name": "convert_audio", "params": params, "skipped": str(e)})
+                continue
+            results.append(summarize("conversion", "convert_audio", params, timings, seconds))
+    return results
+
+
+def result_key(result):
+    return result["stage"], result["name"], json.dumps(result["params"], sort_keys=True)
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {result_key(r): r for r in json.load(f)["results"] if "median_ms" in r}
+
+    regressions = 0
+    for result in results:
+        if "median_ms" not in result:
+            continue
+        before = baseline.get(result_key(result))
+        if not before:
+            continue
+        change = result["median_ms"] / before["median_ms"] - 1
+        if change > threshold:
+            regressions += 1
+            print(f"REGRESSION {result['stage']}/{result['name']} {result['params']}: "
+                  f"{before['median_ms']:.1f} -> {result['median_ms']:.1f} ms ({change:+.0%})")
+    print(f"{regressions} regression(s) above {threshold:.0%} against {baseline_path}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--runs", type=int, default=5, help="Timed runs per measurement")
+    parser.add_argument("--rtf", type=float, default=0.0, help="Artificial real-time factor of the stub model")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", help="Earlier --json output to compare medians against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Relative slowdown reported as a regression")
+    args = parser.parse_args()
+
+    # Per-call INFO logs from the code under test would dominate the output and the timings
+    logging.disable(logging.INFO)
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        cloner = None
+        if "preprocessing" in args.stages or "end_to_end" in args.stages:
+            cloner = make_cloner(args, workdir)
+
+        runners = {
+            "preprocessing": lambda: bench_preprocessing(args, workdir, cloner),
+            "effects": lambda: bench_effects(args),
+            "end_to_end": lambda: bench_end_to_end(args, workdir, cloner),
+            "conversion": lambda: bench_conversion(args, workdir),
+        }
+        for stage in args.stages:
+            start = time.perf_counter()
+            try:
+                stage_results = runners[stage]()
+            except Exception as e:
+                # A missing optional tool (e.g. ffmpeg) should not sink the other stages
+                print(f"{stage}: skipped ({str(e)})")
+                results.append({"stage": stage, "skipped": str(e)})
+                continue
+            results.extend(stage_results)
+            print(f"{stage}: {len(stage_results)} measurements in {time.perf_counter() - start:.1f}s")
+            for r in stage_results:
+                if "skipped" in r:
+                    print(f"  {r['name']:<16} {json.dumps(r['params'], ensure_ascii=False):<48} skipped")
+                    continue
+                rtf = f"  RTF={r['rtf']:.4f}" if "rtf" in r else ""
+                print(f"  {r['name']:<16} {json.dumps(r['params'], ensure_ascii=False):<48} "
+                      f"median={r['median_ms']:9.2f} ms  p95={r['p95_ms']:9.2f} ms{rtf}")
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "runs": args.runs,
+            "stub_rtf": args.rtf,
+            "peak_rss_mb": peak_rss_mb(),
+        },
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.baseline:
+        compare(results, args.baseline, args.threshold)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Tiny stand-in for the XTTS ``Xtts`` model, so synthesis paths can be benchmarked offline.
+
+Implements just the surface ``xtts_utils`` uses. Output is a deterministic
+voiced waveform whose length follows the text and speed, and ``rtf`` adds a
+fixed compute delay per second of audio to imitate model cost.
+"""
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import torch
+
+STUB_SAMPLE_RATE = 24000
+SECONDS_PER_CHAR = 0.065
+
+
+class StubXtts:
+    def __init__(self, rtf=0.0, sample_rate=STUB_SAMPLE_RATE):
+        self.rtf = rtf
+        self.config = SimpleNamespace(
+            audio=SimpleNamespace(output_sample_rate=sample_rate),
+            gpt_cond_len=30,
+            gpt_cond_chunk_len=4,
+            max_ref_len=30,
+            sound_norm_refs=False,
+            temperature=0.75,
+            length_penalty=1.0,
+            repetition_penalty=10.0,
+            top_k=50,
+            top_p=0.85,
+        )
+        self._weight = torch.zeros(1)
+
+    def parameters(self):
+        return iter([self._weight])
+
+    def get_conditioning_latents(self, audio_path, **kwargs):
+        return torch.zeros(1, 32, 1024), torch.zeros(1, 512, 1)
+
+    def get_speaker_embedding(self, audio, sr):
+        return torch.zeros(1, 512, 1)
+
+    def get_gpt_cond_latents(self, audio, sr, length=30, chunk_length=4):
+        return torch.zeros(1, 32, 1024)
+
+    def _render(self, text, speed):
+        sr = self.config.audio.output_sample_rate
+        num_samples = max(1, int(len(text) * SECONDS_PER_CHAR / speed * sr))
+        t = np.arange(num_samples, dtype=np.float32) / sr
+        # Harmonic "voice" with a syllable-rate envelope, so effects and trimming see realistic dynamics
+        wav = (0.3 * np.sin(2 * np.pi * 140 * t) + 0.1 * np.sin(2 * np.pi * 280 * t)) * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t))
+        if self.rtf:
+            time.sleep(num_samples / sr * self.rtf)
+        return wav.astype(np.float32)
+
+    def inference(self, text, language, gpt_cond_latent, speaker_embedding, speed=1.0, **kwargs):
+        return {"wav": self._render(text, speed)}
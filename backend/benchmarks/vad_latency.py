@@ -0,0 +1,64 @@
+"""
+Per-call reference preprocessing latency: per-request hub load vs. the shared VAD registry.
+
+Run from ``backend/``:
+
+    python -m benchmarks.vad_latency uploads/db.mp3 --runs 5
+"""
+import argparse
+import statistics
+import time
+
+import librosa
+import numpy as np
+import torch
+
+import vad
+
+
+def legacy_preprocess(audio, sr):
+    # What VoiceCloner.preprocess_audio used to do on every call
+    vad_model, vad_utils = torch.hub.load('snakers4/silero-vad', 'silero_vad')
+    get_speech_timestamps, *_ = vad_utils
+    timestamps = get_speech_timestamps(torch.tensor(audio, dtype=torch.float32), vad_model, sampling_rate=sr)
+    speech = np.concatenate([audio[t['start']:t['end']] for t in timestamps]) if timestamps else audio
+    return librosa.util.normalize(speech)
+
+
+def registry_preprocess(audio, sr):
+    timestamps = vad.speech_timestamps(audio, sr)
+    speech = np.concatenate([audio[start:end] for start, end in timestamps]) if timestamps else audio
+    return librosa.util.normalize(speech)
+
+
+def time_calls(fn, audio, sr, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(audio, sr)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(label, timings):
+    print(f"{label:<22} first={timings[0]:8.1f} ms  median={statistics.median(timings):8.1f} ms  "
+          f"min={min(timings):8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="Reference audio file")
+    parser.add_argument("--runs", type=int, default=5, help="Calls per variant")
+    parser.add_argument("--skip-legacy", action="store_true", help="Skip the torch.hub baseline (needs network on a cold cache)")
+    args = parser.parse_args()
+
+    audio, sr = librosa.load(args.input, sr=None)
+    print(f"Input: {args.input} ({len(audio) / sr:.1f}s @ {sr} Hz), {args.runs} runs each")
+
+    if not args.skip_legacy:
+        report("before (hub per call)", time_calls(legacy_preprocess, audio, sr, args.runs))
+    report("after (registry)", time_calls(registry_preprocess, audio, sr, args.runs))
+
+
+if __name__ == "__main__":
+    main()
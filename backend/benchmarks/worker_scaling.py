@@ -0,0 +1,104 @@
+"""
+Aggregate synthesis throughput of the forked worker pool versus worker count.
+
+Loads the model once, then for each worker count forks a fresh pool that splits
+the available cores evenly between workers, pushes the same batch of clips
+through it and reports clips/sec and the scaling efficiency relative to a
+single worker. Run from ``backend/``:
+
+    python -m benchmarks.worker_scaling uploads/db.mp3 --workers 1 2 4 8 --clips 32
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from emotion import VoiceCloner
+from worker_pool import SynthesisWorkerPool
+
+TEXTS = [
+    "The quick brown fox jumps over the lazy dog.",
+    "Real-time factor is what decides how many voices one node can serve at once.",
+    "Every worker owns a slice of the cores and a copy-on-write view of the weights.",
+    "Short clips keep the benchmark honest about per-request overhead.",
+]
+
+
+def warmup_worker(cloner):
+    cloner.warmup()
+
+
+def synthesize_clip(cloner, text, speaker_wav, output_wav, language):
+    if not cloner.clone_voice(text, speaker_wav, output_wav, language=language):
+        raise RuntimeError(f"Synthesis failed for {output_wav}")
+    return output_wav
+
+
+def run(cloner, num_workers, threads_per_worker, clips, speaker_wav, language, output_dir):
+    pool = SynthesisWorkerPool(cloner, num_workers=num_workers, threads_per_worker=threads_per_worker)
+    try:
+        pool.broadcast(warmup_worker)
+        # Prime each worker's conditioning cache so only synthesis is measured
+        pool.broadcast(synthesize_clip, TEXTS[0], speaker_wav, os.path.join(output_dir, "prime.wav"), language)
+
+        start = time.perf_counter()
+        futures = [
+            pool.submit(
+                synthesize_clip,
+                TEXTS[i % len(TEXTS)],
+                speaker_wav,
+                os.path.join(output_dir, f"{num_workers}_{i}.wav"),
+                language,
+            )
+            for i in range(clips)
+        ]
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - start
+    finally:
+        pool.shutdown()
+
+    return {
+        "workers": num_workers,
+        "threads_per_worker": pool.threads_per_worker,
+        "clips": clips,
+        "seconds": elapsed,
+        "clips_per_sec": clips / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("speaker_wav", help="Reference speaker audio")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clips", type=int, default=16, help="Clips per run")
+    parser.add_argument("--threads-per-worker", type=int, default=0,
+                        help="Fixed thread count per worker (0 = split cores evenly)")
+    parser.add_argument("--language", default="en")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    # Output caching would turn repeated texts into file copies
+    cloner = VoiceCloner(output_cache_dir=None)
+
+    results = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        for num_workers in args.workers:
+            result = run(cloner, num_workers, args.threads_per_worker or None, args.clips,
+                         args.speaker_wav, args.language, output_dir)
+            # Throughput relative to perfectly linear scaling from the first run
+            baseline = results[0] if results else result
+            per_worker = baseline["clips_per_sec"] / baseline["workers"]
+            result["efficiency"] = result["clips_per_sec"] / (per_worker * num_workers)
+            results.append(result)
+            print(f"workers={num_workers:<3} threads/worker={result['threads_per_worker']:<3} "
+                  f"{result['clips_per_sec']:.2f} clips/s  efficiency={result['efficiency']:.0%}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
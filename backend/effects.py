@@ -0,0 +1,123 @@
+import numpy as np
+
+# Length of one dynamic-volume block, matching the old 200ms pydub chunks
+VOLUME_BLOCK_MS = 200
+
+
+def pitch_shift(audio, semitones):
+    """
+    Shifts pitch by resampling, like replaying the clip at a faster frame rate.
+
+    As with the previous pydub implementation, duration scales inversely with
+    the pitch ratio.
+    """
+    if semitones == 0 or len(audio) == 0:
+        return audio
+
+    ratio = 2 ** (semitones / 12.0)
+    positions = np.arange(0, len(audio), ratio)
+    return np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+
+
+def apply_reverb(audio, intensity=0):
+    """
+    Mixes the clip onto itself with an intensity-dependent gain, as pydub's
+    ``overlay(audio, gain_during_overlay=...)`` did.
+    """
+    if intensity <= 0:
+        return audio
+
+    overlay_gain = 10 ** ((-10 + 5 * intensity) / 20.0)
+    return np.clip(audio * (1.0 + overlay_gain), -1.0, 1.0).astype(np.float32)
+
+
+def volume_envelope(num_samples, sr, emotion, offset=0):
+    """
+    Builds the per-200ms gain envelope for an emotion.
+
+    Args:
+        num_samples (int): Length of the envelope.
+        sr (int): Sample rate.
+        emotion (str): Emotion name; only "excited" and "sad" fluctuate.
+        offset (int): Sample index of the first sample within the whole clip,
+            so streamed chunks continue the same envelope.
+
+    Returns:
+        np.ndarray | None: Linear gain per sample, or None when flat.
+    """
+    if emotion not in ("excited", "sad"):
+        return None
+
+    block_len = max(1, sr * VOLUME_BLOCK_MS // 1000)
+    blocks = (offset + np.arange(num_samples)) // block_len
+    if emotion == "excited":
+        gain_db = np.sin(blocks / 3) * 2  # Slight fluctuation
+    else:
+        gain_db = np.cos(blocks / 5) * -2  # Quieter fluctuations
+    return (10 ** (gain_db / 20.0)).astype(np.float32)
+
+
+def add_dynamic_volume(audio, sr, emotion, offset=0):
+    envelope = volume_envelope(len(audio), sr, emotion, offset)
+    if envelope is None:
+        return audio
+    return np.clip(audio * envelope, -1.0, 1.0)
+
+
+def apply_emotion_effects(audio, sr, semitones=0, reverb_intensity=0, emotion=None, offset=0):
+    """
+    Runs pitch shift, reverb and the dynamic volume envelope over a waveform in memory.
+
+    Args:
+        audio (np.ndarray): Float mono waveform in [-1, 1].
+        sr (int): Sample rate.
+        semitones (float): Pitch shift in semitones.
+        reverb_intensity (int): Reverb intensity; 0 disables it.
+        emotion (str): Emotion driving the volume envelope.
+        offset (int): Output sample offset of this chunk when streaming.
+
+    Returns:
+        np.ndarray: Processed float32 waveform.
+    """
+    audio = np.asarray(audio, dtype=np.float32)
+    audio = pitch_shift(audio, semitones)
+    audio = apply_reverb(audio, reverb_intensity)
+    return add_dynamic_volume(audio, sr, emotion, offset)
+
+
+def crossfade_concat(segments, sr, crossfade_ms=30):
+    """
+    Joins waveforms end to end, overlapping each boundary with an equal-power crossfade.
+
+    Args:
+        segments (list[np.ndarray]): Float mono waveforms in order.
+        sr (int): Sample rate.
+        crossfade_ms (int): Overlap length at each boundary; shortened when a
+            segment is shorter than that.
+
+    Returns:
+        np.ndarray: The stitched float32 waveform.
+    """
+    segments = [np.asarray(segment, dtype=np.float32) for segment in segments if len(segment)]
+    if not segments:
+        return np.zeros(0, dtype=np.float32)
+
+    fade_len = sr * crossfade_ms // 1000
+    overlaps = [min(fade_len, len(a), len(b)) for a, b in zip(segments, segments[1:])]
+    output = np.empty(sum(len(segment) for segment in segments) - sum(overlaps), dtype=np.float32)
+
+    position = len(segments[0])
+    output[:position] = segments[0]
+    for segment, overlap in zip(segments[1:], overlaps):
+        start = position - overlap
+        if overlap:
+            t = np.linspace(0.0, np.pi / 2, overlap, dtype=np.float32)
+            output[start:position] = output[start:position] * np.cos(t) + segment[:overlap] * np.sin(t)
+        output[position:start + len(segment)] = segment[overlap:]
+        position = start + len(segment)
+    return output
+
+
+def to_pcm16(audio):
+    """Converts a float waveform in [-1, 1] to little-endian 16-bit PCM bytes."""
+    return (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2").tobytes()
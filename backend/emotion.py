@@ -1,16 +1,26 @@
 import torch
-from TTS.api import TTS
-import librosa
-import soundfile as sf
 import numpy as np
-from pydub import AudioSegment
-import noisereduce as nr
 import os
+import shutil
+import time
 import logging
-from silero_vad import get_speech_timestamps
 from TTS.tts.configs.xtts_config import XttsConfig
 from TTS.tts.models.xtts import XttsAudioConfig, XttsArgs
 from TTS.config.shared_configs import BaseDatasetConfig
+from model_loader import (
+    XTTS_INTEROP_THREADS, XTTS_MMAP, XTTS_MODEL_PATH, XTTS_NUM_THREADS, XTTS_QUANTIZE, load_xtts
+)
+from speaker_cache import SpeakerCache
+from output_cache import OutputCache, cache_key
+from phrase_cache import PhraseCache
+from audio_buffer import AudioBuffer, iter_blocks
+import effects
+import encoder
+import metrics
+import preprocessing
+from text_utils import split_segments, split_sentences
+import vad
+import xtts_utils
 
 # Allow PyTorch 2.6+ to load trusted classes
 torch.serialization.add_safe_globals([
@@ -20,70 +30,164 @@ torch.serialization.add_safe_globals([
     XttsArgs
 ])
 
+EMOTION_PITCH = {
+    "neutral": 0,
+    "excited": 4,
+    "sad": -3,
+    "angry": 2,
+    "hesitant": 0
+}
+
+EMOTION_SPEED = {
+    "neutral": 1.0,
+    "excited": 1.3,
+    "sad": 0.8,
+    "angry": 1.1,
+    "hesitant": 0.9
+}
+
+EMOTION_REVERB = {
+    "neutral": 0,
+    "excited": 2,
+    "sad": 1,
+    "angry": 1,
+    "hesitant": 0
+}
+
+# Texts longer than this are synthesized segment by segment and stitched
+LONG_FORM_MIN_CHARS = int(os.getenv("LONG_FORM_MIN_CHARS", "400"))
+LONG_FORM_CROSSFADE_MS = 30
+SEGMENT_RETRIES = 2
+
+# Budgets for rendered sentences reused across scripts: memory is per process,
+# the disk tier is shared by the server and its synthesis workers
+PHRASE_CACHE_MAX_BYTES = int(os.getenv("PHRASE_CACHE_MB", "128")) * 1024 * 1024
+PHRASE_CACHE_MAX_DISK_BYTES = int(os.getenv("PHRASE_CACHE_DISK_MB", "1024")) * 1024 * 1024
+
 logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(_name_)
+logger = logging.getLogger(__name__)
+
+
+def _synthesize_segment_task(cloner, index, segment, language, latents, speed, retries):
+    # Runs inside a SynthesisWorkerPool process
+    return cloner._synthesize_segment(index, segment, language, latents, speed, retries)
+
 
 class VoiceCloner:
-    def _init_(self):
+    def __init__(self, speaker_cache_dir="speaker_cache", output_cache_dir="output_cache",
+                 output_cache_max_bytes=1024 * 1024 * 1024, phrase_cache_dir="phrase_cache",
+                 phrase_cache_max_bytes=PHRASE_CACHE_MAX_BYTES,
+                 phrase_cache_max_disk_bytes=PHRASE_CACHE_MAX_DISK_BYTES, model_path=XTTS_MODEL_PATH, mmap=XTTS_MMAP,
+                 quantize=XTTS_QUANTIZE, num_threads=XTTS_NUM_THREADS, interop_threads=XTTS_INTEROP_THREADS,
+                 warmup=False, tts_model=None):
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         logger.info(f"Using device: {self.device}")
 
-        try:
-            self.model = TTS("tts_models/multilingual/multi-dataset/xtts_v2", progress_bar=True).to(self.device)
-            logger.info("XTTS v2 model loaded successfully")
-        except Exception as e:
-            logger.error(f"Error loading XTTS v2 model: {str(e)}")
-            raise
+        if tts_model is not None:
+            # Injected model, e.g. the stub used by the offline benchmarks
+            self.tts_model = tts_model
+        else:
+            try:
+                self.tts_model = load_xtts(
+                    self.device,
+                    model_path=model_path,
+                    mmap=mmap,
+                    quantize=quantize,
+                    num_threads=num_threads,
+                    interop_threads=interop_threads
+                )
+                logger.info("XTTS v2 model loaded successfully")
+            except Exception as e:
+                logger.error(f"Error loading XTTS v2 model: {str(e)}")
+                raise
+
+        self.speaker_cache = SpeakerCache(
+            speaker_cache_dir, device=self.device, namespace=f"emotion-vad-v{preprocessing.PREPROCESS_VERSION}"
+        )
+        self.sample_rate = self.tts_model.config.audio.output_sample_rate
+
+        # Rendered outputs keyed by every synthesis parameter; None disables it
+        self.output_cache = None
+        if output_cache_dir:
+            self.output_cache = OutputCache(output_cache_dir, max_bytes=output_cache_max_bytes)
+
+        # Raw sentence renders reused across different scripts; None disables it
+        self.phrase_cache = None
+        if phrase_cache_dir:
+            self.phrase_cache = PhraseCache(
+                phrase_cache_dir, max_bytes=phrase_cache_max_bytes, max_disk_bytes=phrase_cache_max_disk_bytes
+            )
+
+        # Worker pool long-form segments are fanned out to; see use_worker_pool
+        self._segment_pool = None
+        self._segment_pool_pid = None
+
+        # Load the VAD model up front so the first request does not pay for it
+        vad.get_vad_model()
+
+        if warmup:
+            self.warmup()
+        self.ready = True
+
+    def warmup(self):
+        """Runs a short synthesis so the first real request does not pay cold-start costs."""
+        start = time.perf_counter()
+        xtts_utils.warmup(self.tts_model)
+        logger.info(f"Warm-up finished in {time.perf_counter() - start:.2f}s")
+
+    def use_worker_pool(self, pool):
+        """
+        Synthesizes long-form segments on ``pool``'s workers, several at a time.
+
+        Only applies in the calling process: workers forked from it (including
+        replacements forked later) inherit the attribute but render their own
+        segments in order, so a worker never submits to the pool.
+        """
+        self._segment_pool = pool
+        self._segment_pool_pid = os.getpid()
+
+    def is_segmented(self, text):
+        """True when ``clone_voice`` renders ``text`` segment by segment."""
+        # Multi-sentence scripts are segmented while the phrase cache is on, so each
+        # sentence can be reused; a single sentence is one lookup on the short path
+        return len(text) > LONG_FORM_MIN_CHARS or bool(self.phrase_cache and len(split_segments(text)) > 1)
+
+    def get_speaker_latents(self, speaker_wav, speaker_key=None):
+        return self.speaker_cache.get_or_compute(speaker_wav, self._compute_speaker_latents, key=speaker_key)
+
+    def _compute_speaker_latents(self, speaker_wav):
+        reference = self.preprocess_audio(speaker_wav)
+        return xtts_utils.compute_conditioning_from_array(self.tts_model, reference.samples, reference.sr)
 
     def preprocess_audio(self, input_wav):
-        audio, sr = librosa.load(input_wav, sr=None)
-        vad_model, vad_utils = torch.hub.load('snakers4/silero-vad', 'silero_vad')
-        get_speech_timestamps, *_ = vad_utils
-        vad_timestamps = get_speech_timestamps(torch.tensor(audio, dtype=torch.float32), vad_model, sampling_rate=sr)
-        speech_audio = np.concatenate([audio[t['start']:t['end']] for t in vad_timestamps])
-        speech_audio = librosa.util.normalize(speech_audio)
-        processed_path = f"processed_{os.path.basename(input_wav)}"
-        sf.write(processed_path, speech_audio, sr)
-        return processed_path
-
-    def pitch_shift(self, input_wav, semitones):
-        if semitones == 0:
-            return input_wav
-
-        audio = AudioSegment.from_wav(input_wav)
-        shifted = audio._spawn(audio.raw_data, overrides={
-            "frame_rate": int(audio.frame_rate * (2 ** (semitones / 12.0)))
-        }).set_frame_rate(audio.frame_rate)
-
-        shifted_path = f"pitch_shifted_{os.path.basename(input_wav)}"
-        shifted.export(shifted_path, format="wav")
-        return shifted_path
-
-    def apply_reverb(self, input_wav, intensity=0):
-        if intensity <= 0:
-            return input_wav
-        
-        audio = AudioSegment.from_wav(input_wav)
-        reverb = audio.overlay(audio, gain_during_overlay=-10 + (5 * intensity))
-        reverb_path = f"reverb_{os.path.basename(input_wav)}"
-        reverb.export(reverb_path, format="wav")
-        return reverb_path
-
-    def add_dynamic_volume(self, input_wav, emotion):
-        audio = AudioSegment.from_wav(input_wav)
-        segments = []
-        for i, chunk in enumerate(audio[::200]):  # 200ms chunks
-            gain = 0
-            if emotion == "excited":
-                gain = np.sin(i / 3) * 2  # Slight fluctuation
-            elif emotion == "sad":
-                gain = np.cos(i / 5) * -2  # Quieter fluctuations
-            segments.append(chunk + gain)
-
-        dynamic_audio = sum(segments)
-        dynamic_path = f"dynamic_{os.path.basename(input_wav)}"
-        dynamic_audio.export(dynamic_path, format="wav")
-        return dynamic_path
+        """
+        Keeps the speech regions of a reference and peak-normalizes them, in memory.
+
+        The file is read and run through VAD block by block, and reading stops
+        once ``max_ref_len`` seconds of speech are collected, since XTTS
+        conditioning ignores the rest. Memory stays bounded however long the
+        recording is.
+        """
+        max_frames = None
+        speech, collected = [], 0
+        with metrics.span("clone_voice", "vad"):
+            for block in iter_blocks(input_wav, block_seconds=preprocessing.REFERENCE_BLOCK_SECONDS):
+                max_frames = int(self.tts_model.config.max_ref_len * block.sr)
+                # Copied so the kept speech does not pin whole blocks in memory
+                for piece in block.segments(vad.speech_timestamps(block.samples, block.sr)):
+                    speech.append(piece.copy())
+                    collected += len(piece)
+                if collected >= max_frames:
+                    break
+
+        if not speech:
+            logger.warning(f"No speech detected in {input_wav}, using the start of the recording")
+            speech = list(iter_blocks(input_wav, max_seconds=self.tts_model.config.max_ref_len))
+            if not speech:
+                raise ValueError(f"No audio in {input_wav}")
+
+        reference = AudioBuffer.concat(speech)[:max_frames]
+        return reference.with_samples(preprocessing.normalize(reference.samples))
 
     def add_pauses(self, text, emotion):
         if emotion == "hesitant":
@@ -94,68 +198,231 @@ class VoiceCloner:
             return spaced_text.strip()
         return text
 
+    def _output_key(self, speaker_key, text, language, speed, emotion, output_format):
+        if not self.output_cache:
+            return None
+        return cache_key({
+            "speaker": speaker_key,
+            "text": text,
+            "language": language,
+            "speed": speed,
+            "emotion": emotion,
+            "format": output_format,
+        })
+
+    def _write_output(self, wav, sample_rate, output_wav, output_key, emotion):
+        # Apply pitch shift, reverb and volume dynamics based on emotion, all in memory
+        with metrics.span("clone_voice", "effects"):
+            processed = AudioBuffer(effects.apply_emotion_effects(
+                wav,
+                sample_rate,
+                semitones=EMOTION_PITCH.get(emotion, 0),
+                reverb_intensity=EMOTION_REVERB.get(emotion, 0),
+                emotion=emotion
+            ), sample_rate)
+        # Encoded straight to the requested format, no WAV intermediate
+        with metrics.span("clone_voice", "write"):
+            processed.write(output_wav)
+        metrics.record_audio("clone_voice", processed.duration)
+
+        if output_key:
+            cached_path = self.output_cache.path_for(output_key, encoder.format_for(output_wav))
+            # Other processes share the cache directory, so the entry appears under its name only once complete
+            tmp_path = f"{cached_path}.{os.getpid()}.part"
+            shutil.copyfile(output_wav, tmp_path)
+            os.replace(tmp_path, cached_path)
+            self.output_cache.add(output_key, cached_path)
+
     def clone_voice(self, text, speaker_wav, output_wav, language="hi", speed=1.0, emotion=None):
-        try:
-            processed_speaker = self.preprocess_audio(speaker_wav)
-
-            emotion_pitch = {
-                "neutral": 0,
-                "excited": 4,
-                "sad": -3,
-                "angry": 2,
-                "hesitant": 0
-            }
+        if self.is_segmented(text):
+            return self.clone_long_form(text, speaker_wav, output_wav, language=language, speed=speed, emotion=emotion)
 
-            emotion_speed = {
-                "neutral": 1.0,
-                "excited": 1.3,
-                "sad": 0.8,
-                "angry": 1.1,
-                "hesitant": 0.9
-            }
+        with metrics.span("clone_voice", "total"):
+            try:
+                speaker_key = self.speaker_cache.key_for(speaker_wav)
+                output_format = encoder.format_for(output_wav)
 
-            emotion_reverb = {
-                "neutral": 0,
-                "excited": 2,
-                "sad": 1,
-                "angry": 1,
-                "hesitant": 0
-            }
+                output_key = self._output_key(speaker_key, text, language, speed, emotion, output_format)
+                if output_key:
+                    hit = self.output_cache.copy_to(output_key, output_wav, output_format)
+                    metrics.record_cache("xtts_output", hit)
+                    if hit:
+                        logger.info(f"Served cached output for emotion '{emotion}': {output_wav}")
+                        return True
+
+                with metrics.span("clone_voice", "conditioning"):
+                    latents = self.get_speaker_latents(speaker_wav, speaker_key)
+
+                # Apply emotion-based changes; pauses are added to the text right before synthesis
+                if emotion:
+                    speed *= EMOTION_SPEED.get(emotion, 1.0)
+
+                with metrics.span("clone_voice", "synthesis"):
+                    wav = self._render_segments([text], speaker_key, language, latents, speed, emotion, retries=0)[0]
+                sample_rate = self.sample_rate
+                self._write_output(wav, sample_rate, output_wav, output_key, emotion)
 
-            # Apply emotion-based changes
+                logger.info(f"Voice cloning completed with emotion '{emotion}': {output_wav}")
+                return True
+
+            except Exception as e:
+                metrics.record_error("clone_voice", "total")
+                logger.error(f"Error in voice cloning: {str(e)}")
+                return False
+
+    def _synthesize_segment(self, index, segment, language, latents, speed, retries):
+        for attempt in range(retries + 1):
+            try:
+                wav, _ = xtts_utils.synthesize(self.tts_model, segment, language, *latents, speed=speed)
+                return wav
+            except Exception as e:
+                if attempt == retries:
+                    raise RuntimeError(f"Segment {index} failed after {retries + 1} attempts: {str(e)}") from e
+                metrics.record_error("clone_voice", "segment")
+                logger.warning(f"Segment {index} failed (attempt {attempt + 1}), retrying: {str(e)}")
+
+    def _render_segments(self, segments, speaker_key, language, latents, speed, emotion, retries):
+        """
+        Returns the raw waveform of every segment, in order.
+
+        Segments found in the phrase cache are reused; the rest are
+        synthesized once per distinct sentence, even if the script repeats it,
+        and stored for later scripts. With a worker pool (``use_worker_pool``)
+        they are spread over the worker processes, each with its own model;
+        otherwise they run one after another, since the model is not
+        re-entrant (see ``xtts_utils.INFERENCE_LOCK``).
+        """
+        wavs = [None] * len(segments)
+        # Phrase key (or index without a cache) -> indices of the segments that share it
+        pending = {}
+        for i, segment in enumerate(segments):
+            key = i
+            if self.phrase_cache:
+                key = self.phrase_cache.key_for(speaker_key, segment, language, speed, emotion)
+                wavs[i] = self.phrase_cache.get(key)
+                metrics.record_cache("phrase", wavs[i] is not None)
+            if wavs[i] is None:
+                pending.setdefault(key, []).append(i)
+
+        texts = {}
+        for key, indices in pending.items():
+            texts[key] = segments[indices[0]]
             if emotion:
-                text = self.add_pauses(text, emotion)
-                speed *= emotion_speed.get(emotion, 1.0)
-
-            temp_output = "raw_tts_output.wav"
-            self.model.tts_to_file(
-                text=text,
-                speaker_wav=processed_speaker,
-                language=language,
-                file_path=temp_output,
-                speed=speed
+                texts[key] = self.add_pauses(texts[key], emotion)
+
+        pool = self._segment_pool if self._segment_pool_pid == os.getpid() else None
+        if pool is not None and len(pending) > 1:
+            # Retries happen inside the worker; results are collected in script order
+            futures = {
+                key: pool.submit(_synthesize_segment_task, indices[0], texts[key], language, latents, speed, retries)
+                for key, indices in pending.items()
+            }
+            rendered = ((key, futures[key].result()) for key in pending)
+        else:
+            rendered = (
+                (key, self._synthesize_segment(indices[0], texts[key], language, latents, speed, retries))
+                for key, indices in pending.items()
             )
 
-            # Apply pitch shift, reverb and volume dynamics based on emotion
-            pitch_shifted = self.pitch_shift(temp_output, emotion_pitch.get(emotion, 0))
-            reverb_applied = self.apply_reverb(pitch_shifted, emotion_reverb.get(emotion, 0))
-            dynamic_volume_applied = self.add_dynamic_volume(reverb_applied, emotion)
+        for key, wav in rendered:
+            indices = pending[key]
+            if self.phrase_cache:
+                wav = self.phrase_cache.put(key, wav)
+            for i in indices:
+                wavs[i] = wav
+        return wavs
+
+    def clone_long_form(self, text, speaker_wav, output_wav, language="hi", speed=1.0, emotion=None,
+                        crossfade_ms=LONG_FORM_CROSSFADE_MS, retries=SEGMENT_RETRIES):
+        """
+        Synthesizes a long script in sentence/clause segments and stitches them.
+
+        Segments are synthesized from the cached speaker latents, in parallel
+        across the worker pool when one is attached, each retried on its own so
+        one failure does not redo the script, then joined in reading order with
+        short crossfades. Sentences already in the
+        phrase cache are not synthesized again, so scripts built from stock
+        sentences cost roughly their novel text. Emotion effects run once over
+        the stitched audio so the volume envelope stays continuous.
+
+        Returns:
+            bool: True when the output file was written.
+        """
+        with metrics.span("clone_voice", "total"):
+            try:
+                speaker_key = self.speaker_cache.key_for(speaker_wav)
+                output_format = encoder.format_for(output_wav)
+
+                output_key = self._output_key(speaker_key, text, language, speed, emotion, output_format)
+                if output_key:
+                    hit = self.output_cache.copy_to(output_key, output_wav, output_format)
+                    metrics.record_cache("xtts_output", hit)
+                    if hit:
+                        logger.info(f"Served cached long-form output: {output_wav}")
+                        return True
+
+                with metrics.span("clone_voice", "conditioning"):
+                    latents = self.get_speaker_latents(speaker_wav, speaker_key)
 
-            os.rename(dynamic_volume_applied, output_wav)
+                segments = split_segments(text)
+                if emotion:
+                    speed *= EMOTION_SPEED.get(emotion, 1.0)
 
-            for tmp_file in [temp_output, pitch_shifted, reverb_applied]:
-                if os.path.exists(tmp_file):
-                    os.remove(tmp_file)
+                start = time.perf_counter()
+                with metrics.span("clone_voice", "synthesis"):
+                    wavs = self._render_segments(
+                        segments, speaker_key, language, latents, speed, emotion, retries
+                    )
 
-            if processed_speaker != speaker_wav:
-                os.remove(processed_speaker)
+                with metrics.span("clone_voice", "stitch"):
+                    wav = effects.crossfade_concat(wavs, self.sample_rate, crossfade_ms)
+                self._write_output(wav, self.sample_rate, output_wav, output_key, emotion)
+
+                logger.info(
+                    f"Segmented synthesis of {len(segments)} segments finished in "
+                    f"{time.perf_counter() - start:.2f}s: {output_wav}"
+                )
+                return True
+
+            except Exception as e:
+                metrics.record_error("clone_voice", "total")
+                logger.error(f"Error in long-form voice cloning: {str(e)}")
+                return False
+
+    def stream_audio(self, text, speaker_wav, language="hi", speed=1.0, emotion=None):
+        """
+        Synthesizes sentence by sentence, yielding float mono chunks at
+        ``self.sample_rate`` as soon as each piece of audio is ready.
+        """
+        gpt_cond_latent, speaker_embedding = self.get_speaker_latents(speaker_wav)
+        tts_model = self.tts_model
+
+        if emotion:
+            speed *= EMOTION_SPEED.get(emotion, 1.0)
+
+        offset = 0
+        for sentence in split_sentences(text):
+            if emotion:
+                sentence = self.add_pauses(sentence, emotion)
 
-            logger.info(f"Voice cloning completed with emotion '{emotion}': {output_wav}")
-            return True
+            for chunk in xtts_utils.synthesize_stream(
+                tts_model, sentence, language, gpt_cond_latent, speaker_embedding, speed=speed
+            ):
+                processed = effects.apply_emotion_effects(
+                    chunk,
+                    self.sample_rate,
+                    semitones=EMOTION_PITCH.get(emotion, 0),
+                    reverb_intensity=EMOTION_REVERB.get(emotion, 0),
+                    emotion=emotion,
+                    offset=offset
+                )
+                offset += len(processed)
+                yield processed
 
-        except Exception as e:
-            logger.error(f"Error in voice cloning: {str(e)}")
-            return False
+    def stream_voice(self, text, speaker_wav, language="hi", speed=1.0, emotion=None):
+        """Like ``stream_audio``, but yields 16-bit mono PCM chunks."""
+        for chunk in self.stream_audio(text, speaker_wav, language=language, speed=speed, emotion=emotion):
+            yield effects.to_pcm16(chunk)
 
 
 def main():
@@ -176,5 +443,5 @@ def main():
         print("Voice cloning failed.")
 
 
-if _name_ == "_main_":
+if __name__ == "__main__":
     main()
\ No newline at end of file
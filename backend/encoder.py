@@ -0,0 +1,328 @@
+"""
+Encodes in-memory waveforms straight to the delivery format.
+
+wav, flac, ogg (Vorbis) and mp3 are encoded in-process by libsndfile, so no
+WAV intermediate or child process is involved. aac and m4a, which libsndfile
+cannot write, go through an ffmpeg process fed raw samples over a pipe.
+``StreamEncoder`` does the same incrementally for streamed responses.
+
+aac/m4a still start one ffmpeg process per call (per file, per stream). A
+shared long-lived encoder cannot cut its output back into per-request files:
+AAC frames span 1024 samples plus encoder priming, so request boundaries
+would bleed into each other, and an m4a needs its own container header.
+"""
+import io
+import os
+import queue
+import subprocess
+import threading
+
+import numpy as np
+import soundfile as sf
+
+from wav_utils import wav_stream_header
+
+# Format -> (libsndfile container, subtype)
+SOUNDFILE_FORMATS = {
+    "wav": ("WAV", "PCM_16"),
+    "flac": ("FLAC", "PCM_16"),
+    "ogg": ("OGG", "VORBIS"),
+    "mp3": ("MP3", "MPEG_LAYER_III"),
+}
+
+# PCM containers can keep a source's sample format instead of the PCM_16 default;
+# wider sources fall back to 24-bit where the container has no exact match
+LOSSLESS_FORMATS = {"wav", "flac"}
+_WIDE_SUBTYPES = {"PCM_24", "PCM_32", "FLOAT", "DOUBLE"}
+
+# Format -> ffmpeg output arguments, for a file and for a pipe
+FFMPEG_FORMATS = {
+    "aac": (["-c:a", "aac", "-f", "adts"], ["-c:a", "aac", "-f", "adts"]),
+    # A fragmented MP4 can be written to a pipe; a file gets a regular moov atom
+    "m4a": (["-c:a", "aac", "-f", "ipod"], ["-c:a", "aac", "-f", "mp4", "-movflags", "frag_keyframe+empty_moov"]),
+}
+
+# libsndfile can only patch the MP3 VBR header by seeking back, which a stream cannot do;
+# constant bitrate keeps every frame self-describing
+STREAM_MP3_OPTIONS = {"bitrate_mode": "CONSTANT", "compression_level": 0.5}
+
+MIME_TYPES = {
+    "wav": "audio/wav",
+    "flac": "audio/flac",
+    "ogg": "audio/ogg",
+    "mp3": "audio/mpeg",
+    "aac": "audio/aac",
+    "m4a": "audio/mp4",
+}
+
+SUPPORTED_FORMATS = sorted(MIME_TYPES)
+
+# FLAC's STREAMINFO (length, checksum) is only known at the end, so it is not offered for streaming
+STREAM_FORMATS = [fmt for fmt in SUPPORTED_FORMATS if fmt != "flac"]
+
+
+def format_for(path):
+    return os.path.splitext(path)[1].lstrip(".").lower()
+
+
+def _check_format(fmt):
+    if fmt not in MIME_TYPES:
+        raise ValueError(f"Unsupported output format: {fmt}. Supported formats: {SUPPORTED_FORMATS}")
+
+
+def _channels(audio):
+    return 1 if audio.ndim == 1 else audio.shape[1]
+
+
+def _soundfile_subtype(fmt, subtype=None):
+    container, default = SOUNDFILE_FORMATS[fmt]
+    if subtype is None or fmt not in LOSSLESS_FORMATS:
+        return container, default
+    if sf.check_format(container, subtype):
+        return container, subtype
+    if subtype in _WIDE_SUBTYPES and sf.check_format(container, "PCM_24"):
+        return container, "PCM_24"
+    return container, default
+
+
+def _ffmpeg_command(sr, output_args, target, channels=1):
+    return [
+        "ffmpeg", "-v", "error", "-y",
+        "-f", "f32le", "-ar", str(sr), "-ac", str(channels), "-i", "pipe:0",
+        *output_args, target,
+    ]
+
+
+def write(audio, sr, path, fmt=None, subtype=None):
+    """
+    Encodes a float waveform to ``path``.
+
+    Args:
+        audio (np.ndarray): Float waveform in [-1, 1], 1-D or ``(frames, channels)``.
+        sr (int): Sample rate.
+        path (str): Destination file.
+        fmt (str): Target format; defaults to the file extension.
+        subtype (str): libsndfile sample format to keep for wav/flac (e.g. the
+            source's ``PCM_24`` or ``FLOAT``); defaults to ``PCM_16``.
+    """
+    fmt = fmt or format_for(path)
+    _check_format(fmt)
+    audio = np.clip(np.asarray(audio, dtype=np.float32), -1.0, 1.0)
+
+    if fmt in SOUNDFILE_FORMATS:
+        container, subtype = _soundfile_subtype(fmt, subtype)
+        sf.write(path, audio, sr, format=container, subtype=subtype)
+        return path
+
+    subprocess.run(
+        _ffmpeg_command(sr, FFMPEG_FORMATS[fmt][0], path, _channels(audio)),
+        input=audio.tobytes(), capture_output=True, check=True
+    )
+    return path
+
+
+def encode(audio, sr, fmt):
+    """Encodes a float waveform and returns the encoded bytes."""
+    _check_format(fmt)
+    audio = np.clip(np.asarray(audio, dtype=np.float32), -1.0, 1.0)
+
+    if fmt in SOUNDFILE_FORMATS:
+        buffer = io.BytesIO()
+        container, subtype = SOUNDFILE_FORMATS[fmt]
+        sf.write(buffer, audio, sr, format=container, subtype=subtype)
+        return buffer.getvalue()
+
+    return subprocess.run(
+        _ffmpeg_command(sr, FFMPEG_FORMATS[fmt][1], "pipe:1", _channels(audio)),
+        input=audio.tobytes(), capture_output=True, check=True
+    ).stdout
+
+
+class FileWriter:
+    """
+    Encodes audio to a file block by block, so long outputs are never held whole.
+
+        with encoder.FileWriter(path, sr, channels) as writer:
+            for block in blocks:
+                writer.write(block)
+    """
+
+    def __init__(self, path, sr, channels=1, fmt=None, subtype=None):
+        """``subtype`` is kept for wav/flac where possible, as in ``write``."""
+        fmt = fmt or format_for(path)
+        _check_format(fmt)
+        self.path = path
+        self._file = None
+        self._process = None
+
+        if fmt in SOUNDFILE_FORMATS:
+            container, subtype = _soundfile_subtype(fmt, subtype)
+            self._file = sf.SoundFile(path, "w", sr, channels, format=container, subtype=subtype)
+        else:
+            self._process = subprocess.Popen(
+                _ffmpeg_command(sr, FFMPEG_FORMATS[fmt][0], path, channels),
+                stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+
+    def write(self, audio):
+        audio = np.clip(np.asarray(audio, dtype=np.float32), -1.0, 1.0)
+        if self._file is not None:
+            self._file.write(audio)
+        else:
+            self._process.stdin.write(audio.tobytes())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            return
+        self._process.stdin.close()
+        if self._process.wait() != 0:
+            raise subprocess.CalledProcessError(self._process.returncode, "ffmpeg")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif self._file is not None:
+            self._file.close()
+        else:
+            self._process.kill()
+            self._process.wait()
+        return False
+
+
+class _Drain:
+    """
+    Write-only file object that hands out bytes as soon as they are written.
+
+    libsndfile seeks back on close to patch headers it already wrote (e.g. the
+    MP3 Xing frame); bytes that were already handed out cannot change, so such
+    rewrites are dropped, which leaves a stream every player accepts.
+    """
+
+    def __init__(self):
+        self._sent = 0
+        self._pending = bytearray()
+        self._pos = 0
+
+    def write(self, data):
+        data = bytes(data)
+        start = self._pos
+        self._pos += len(data)
+        if self._pos <= self._sent:
+            return len(data)
+        if start < self._sent:
+            data, start = data[self._sent - start:], self._sent
+
+        offset = start - self._sent
+        self._pending[offset:offset + len(data)] = data
+        return len(data)
+
+    def seek(self, offset, whence=0):
+        end = self._sent + len(self._pending)
+        self._pos = offset if whence == 0 else (self._pos + offset if whence == 1 else end + offset)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def read(self, size=-1):
+        return b""
+
+    def take(self):
+        data = bytes(self._pending)
+        self._sent += len(data)
+        self._pending.clear()
+        return data
+
+
+class StreamEncoder:
+    """
+    Encodes a waveform chunk by chunk for streamed responses.
+
+    Call ``encode`` with each float chunk and send whatever bytes it returns,
+    then send the result of ``finish``. WAV gets a streaming header followed by
+    PCM; libsndfile formats encode in-process; aac/m4a keep one ffmpeg process
+    alive for the whole stream.
+    """
+
+    def __init__(self, sr, fmt):
+        if fmt not in STREAM_FORMATS:
+            raise ValueError(f"Unsupported streaming format: {fmt}. Supported formats: {STREAM_FORMATS}")
+        self.sr = sr
+        self.fmt = fmt
+        self.mimetype = MIME_TYPES[fmt]
+        self._header = None
+        self._file = None
+        self._process = None
+
+        if fmt == "wav":
+            self._header = wav_stream_header(sr)
+        elif fmt in SOUNDFILE_FORMATS:
+            container, subtype = SOUNDFILE_FORMATS[fmt]
+            self._drain = _Drain()
+            options = STREAM_MP3_OPTIONS if fmt == "mp3" else {}
+            self._file = sf.SoundFile(self._drain, "w", sr, 1, format=container, subtype=subtype, **options)
+        else:
+            self._process = subprocess.Popen(
+                _ffmpeg_command(sr, FFMPEG_FORMATS[fmt][1], "pipe:1"),
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+            )
+            self._output = queue.Queue()
+            self._reader = threading.Thread(target=self._read_output, daemon=True)
+            self._reader.start()
+
+    def _read_output(self):
+        for chunk in iter(lambda: self._process.stdout.read1(64 * 1024), b""):
+            self._output.put(chunk)
+
+    def _collect(self):
+        parts = []
+        while True:
+            try:
+                parts.append(self._output.get_nowait())
+            except queue.Empty:
+                return b"".join(parts)
+
+    def encode(self, chunk):
+        """Encodes one float chunk and returns the bytes that are ready (possibly none)."""
+        chunk = np.clip(np.asarray(chunk, dtype=np.float32), -1.0, 1.0)
+
+        if self.fmt == "wav":
+            data = (chunk * 32767).astype("<i2").tobytes()
+            if self._header:
+                data, self._header = self._header + data, None
+            return data
+
+        if self._file is not None:
+            self._file.write(chunk)
+            return self._drain.take()
+
+        self._process.stdin.write(chunk.tobytes())
+        self._process.stdin.flush()
+        return self._collect()
+
+    def finish(self):
+        """Flushes the encoder and returns the remaining bytes."""
+        if self.fmt == "wav":
+            header, self._header = self._header or b"", None
+            return header
+
+        if self._file is not None:
+            self._file.close()
+            return self._drain.take()
+
+        self._process.stdin.close()
+        self._reader.join()
+        self._process.wait()
+        return self._collect()
+
+    def close(self):
+        """Releases the encoder without flushing, e.g. when the client went away."""
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+        if self._process is not None and self._process.poll() is None:
+            self._process.kill()
+            self._process.wait()
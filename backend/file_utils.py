@@ -0,0 +1,21 @@
+import hashlib
+
+
+def hash_file(path, namespace="", chunk_size=1 << 20):
+    """
+    Computes a SHA-256 content hash of a file.
+
+    Args:
+        path (str): Path to the file to hash.
+        namespace (str): Prefix mixed into the digest so different consumers
+            never share entries for the same bytes.
+        chunk_size (int): Number of bytes read per iteration.
+
+    Returns:
+        str: Hex digest of the namespace and file contents.
+    """
+    digest = hashlib.sha256(namespace.encode("utf-8"))
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
@@ -1,14 +1,19 @@
-from flask import Flask, request, jsonify, send_from_directory
-import google.generativeai as genai
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
+import json
 import os
+import metrics
+from llm import GENERATOR_BACKEND, ScriptGenerator, create_backend
+from text_utils import SentenceBuffer
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
 # Initialize the Gemini API with your key
-API_KEY = "elo7Wi9ogWXtzIcuwEBhlLyw0u93"  # Replace with actual key in production
-genai.configure(api_key=API_KEY)
+API_KEY = os.getenv('GEMINI_API_KEY', "elo7Wi9ogWXtzIcuwEBhlLyw0u93")  # Replace with actual key in production
+
+# One model client and response cache shared by every request
+script_generator = ScriptGenerator(create_backend(GENERATOR_BACKEND, api_key=API_KEY))
 
 @app.route('/api/generate', methods=['POST'])
 def generate_script():
@@ -19,19 +24,62 @@ def generate_script():
         return jsonify({'error': 'Prompt is required'}), 400
     
     try:
-        # Initialize the model
-        model = genai.GenerativeModel('gemini-pro')
-        
-        # Generate content
-        response = model.generate_content(prompt)
+        # Generate content, or reuse a recent response to the same prompt
+        with metrics.span('generate_script', 'llm'):
+            text, cached = script_generator.generate(prompt)
+        metrics.record_cache('script', cached)
         
         # Return the generated content
-        return jsonify({'result': response.text})
+        return jsonify({'result': text, 'cached': cached})
     
     except Exception as e:
         print(f"Error generating content: {str(e)}")
         return jsonify({'error': 'Failed to generate content'}), 500
 
+
+@app.route('/api/generate/stream', methods=['POST'])
+def stream_script():
+    """
+    Streams the script over Server-Sent Events as the model produces it.
+
+    ``token`` events carry raw text chunks; ``sentence`` events carry each
+    sentence once it is complete, so the client can start synthesizing early.
+    """
+    data = request.get_json(silent=True) or {}
+    prompt = data.get('prompt', '')
+
+    if not prompt:
+        return jsonify({'error': 'Prompt is required'}), 400
+
+    def events():
+        sentences = SentenceBuffer()
+        try:
+            with metrics.span('generate_script', 'stream'):
+                for chunk in script_generator.stream(prompt):
+                    yield f"event: token\ndata: {json.dumps({'text': chunk}, ensure_ascii=False)}\n\n"
+                    for sentence in sentences.feed(chunk):
+                        yield f"event: sentence\ndata: {json.dumps({'text': sentence}, ensure_ascii=False)}\n\n"
+                for sentence in sentences.flush():
+                    yield f"event: sentence\ndata: {json.dumps({'text': sentence}, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            print(f"Error streaming content: {str(e)}")
+            yield f"event: error\ndata: {json.dumps({'error': 'Failed to generate content'})}\n\n"
+            return
+        yield "event: done\ndata: {}\n\n"
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
+@app.route('/api/generate/stats')
+def generate_stats():
+    return jsonify({'backend': GENERATOR_BACKEND, 'cache': script_generator.cache.stats()})
+
 # Serve React app in production
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -0,0 +1,115 @@
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Janitor:
+    """
+    Background thread that enforces age and total-size quotas on directories.
+
+    Each sweep removes files older than a directory's ``max_age``, then, if the
+    directory is still over ``max_bytes``, the least recently modified files
+    until it fits. Only regular files directly inside each directory are
+    considered, so subdirectories with their own budget (like the output
+    cache) are left alone. Files younger than ``min_age`` are never removed,
+    which protects uploads and outputs that are still in use.
+    """
+
+    def __init__(self, interval=300, min_age=600):
+        """
+        Args:
+            interval (float): Seconds between sweeps.
+            min_age (float): Grace period in seconds before any file may be removed.
+        """
+        self.interval = interval
+        self.min_age = min_age
+
+        self._quotas = []
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.sweeps = 0
+        self.removed_files = 0
+        self.removed_bytes = 0
+
+    def add(self, directory, max_age=None, max_bytes=None):
+        """
+        Registers a directory to keep in check.
+
+        Args:
+            directory (str): Directory to sweep.
+            max_age (float): Maximum file age in seconds; None disables it.
+            max_bytes (int): Maximum total size in bytes; None disables it.
+        """
+        self._quotas.append((directory, max_age, max_bytes))
+        return self
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="janitor", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Janitor sweep failed: {str(e)}")
+            self._stop.wait(self.interval)
+
+    def sweep(self):
+        """Runs one pass over every registered directory."""
+        now = time.time()
+        for directory, max_age, max_bytes in self._quotas:
+            self._sweep_directory(directory, max_age, max_bytes, now)
+        self.sweeps += 1
+
+    def _sweep_directory(self, directory, max_age, max_bytes, now):
+        files = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file(follow_symlinks=False):
+                        stat = entry.stat()
+                        files.append((stat.st_mtime, entry.path, stat.st_size))
+                except FileNotFoundError:
+                    continue
+
+        files.sort()
+        total = sum(size for _, _, size in files)
+        for mtime, path, size in files:
+            age = now - mtime
+            if age < self.min_age:
+                # Sorted oldest first, so everything after this is in its grace period too
+                break
+            expired = max_age is not None and age > max_age
+            over_quota = max_bytes is not None and total > max_bytes
+            if not (expired or over_quota):
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.removed_files += 1
+            self.removed_bytes += size
+
+    def stats(self):
+        return {
+            "sweeps": self.sweeps,
+            "removed_files": self.removed_files,
+            "removed_bytes": self.removed_bytes,
+            "directories": [
+                {"path": directory, "max_age": max_age, "max_bytes": max_bytes}
+                for directory, max_age, max_bytes in self._quotas
+            ],
+        }
@@ -0,0 +1,98 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from scheduler import QueueFullError
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobManager:
+    """
+    Runs background jobs on a bounded thread pool and tracks their status.
+
+    At most ``max_pending`` jobs may be queued or running at once; further
+    submissions raise ``QueueFullError`` so callers can apply backpressure.
+    Finished jobs are kept for ``retention`` seconds for status polling.
+    """
+
+    def __init__(self, max_workers=4, max_pending=32, retention=3600):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.retention = retention
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Schedules ``fn(*args, **kwargs)`` and returns the new job id.
+
+        Raises:
+            QueueFullError: If ``max_pending`` jobs are already queued or running.
+        """
+        with self._lock:
+            self._expire()
+            if self._active >= self.max_pending:
+                raise QueueFullError(f"{self._active} jobs already pending")
+            self._active += 1
+
+            job_id = str(uuid.uuid4())
+            self._jobs[job_id] = {
+                "id": job_id,
+                "status": QUEUED,
+                "result": None,
+                "error": None,
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+            }
+
+        self._executor.submit(self._run, job_id, fn, args, kwargs)
+        return job_id
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def stats(self):
+        with self._lock:
+            counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+            for job in self._jobs.values():
+                counts[job["status"]] += 1
+            return {"max_workers": self.max_workers, "max_pending": self.max_pending, **counts}
+
+    def _run(self, job_id, fn, args, kwargs):
+        self._update(job_id, status=RUNNING, started_at=time.time())
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            self._update(job_id, status=FAILED, error=str(e), finished_at=time.time())
+        else:
+            self._update(job_id, status=DONE, result=result, finished_at=time.time())
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def _expire(self):
+        # Caller holds the lock
+        cutoff = time.time() - self.retention
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job["finished_at"] is not None and job["finished_at"] < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
@@ -0,0 +1,162 @@
+"""
+Script generation backends with a shared TTL response cache.
+
+``GENERATOR_BACKEND=gemini`` (the default) talks to Gemini; ``fake`` produces
+a deterministic script from the prompt locally, so the generator API can be
+developed and tested offline.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+GENERATOR_BACKEND = os.getenv('GENERATOR_BACKEND', 'gemini')
+GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-pro')
+
+SCRIPT_CACHE_TTL = float(os.getenv('SCRIPT_CACHE_TTL', '3600'))
+SCRIPT_CACHE_SIZE = int(os.getenv('SCRIPT_CACHE_SIZE', '256'))
+
+# Delay between words emitted by the fake backend, to mimic token streaming
+FAKE_TOKEN_DELAY = float(os.getenv('FAKE_TOKEN_DELAY', '0.02'))
+
+
+class TTLCache:
+    """Thread-safe LRU mapping whose entries expire ``ttl`` seconds after being stored."""
+
+    def __init__(self, ttl=SCRIPT_CACHE_TTL, max_entries=SCRIPT_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+class GeminiBackend:
+    name = 'gemini'
+
+    def __init__(self, api_key, model_name=GEMINI_MODEL):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt):
+        return self.model.generate_content(prompt).text
+
+    def stream(self, prompt):
+        for chunk in self.model.generate_content(prompt, stream=True):
+            # Chunks blocked by safety filters carry no parts, and .text raises on them
+            if chunk.parts:
+                yield chunk.text
+
+
+class FakeBackend:
+    name = 'fake'
+
+    def __init__(self, token_delay=FAKE_TOKEN_DELAY):
+        self.model_name = 'fake'
+        self.token_delay = token_delay
+
+    def _script(self, prompt):
+        tag = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8]
+        return (
+            f"This is a generated script about {prompt.strip()}. "
+            f"It is produced locally by the fake backend, reference {tag}. "
+            "Each sentence arrives word by word, just like a streamed model response."
+        )
+
+    def generate(self, prompt):
+        return self._script(prompt)
+
+    def stream(self, prompt):
+        words = self._script(prompt).split(' ')
+        for i, word in enumerate(words):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            yield word if i == len(words) - 1 else word + ' '
+
+
+def create_backend(name=GENERATOR_BACKEND, api_key=None):
+    if name == 'fake':
+        return FakeBackend()
+    if name == 'gemini':
+        return GeminiBackend(api_key)
+    raise ValueError(f"Unknown generator backend: {name}")
+
+
+class ScriptGenerator:
+    """Wraps one long-lived backend with a prompt-keyed response cache."""
+
+    def __init__(self, backend, cache=None):
+        self.backend = backend
+        self.cache = cache or TTLCache()
+
+    def _key(self, prompt):
+        return (self.backend.name, self.backend.model_name, prompt)
+
+    def generate(self, prompt):
+        """
+        Returns ``(text, cached)`` for a prompt, calling the backend only on a cache miss.
+        """
+        key = self._key(prompt)
+        text = self.cache.get(key)
+        if text is not None:
+            return text, True
+
+        text = self.backend.generate(prompt)
+        self.cache.put(key, text)
+        return text, False
+
+    def stream(self, prompt):
+        """
+        Yields the script in chunks as the backend produces them.
+
+        A cached script is yielded as a single chunk. A streamed response is
+        cached once it completes, so an abandoned stream is never cached
+        half-finished.
+        """
+        key = self._key(prompt)
+        text = self.cache.get(key)
+        if text is not None:
+            yield text
+            return
+
+        parts = []
+        for chunk in self.backend.stream(prompt):
+            parts.append(chunk)
+            yield chunk
+        self.cache.put(key, ''.join(parts))
@@ -0,0 +1,215 @@
+"""
+Minimal in-process metrics with Prometheus text exposition.
+
+Stages are timed with ``span``; latencies and audio durations go into
+histograms, errors and cache lookups into counters, and ``render`` produces
+the ``/metrics`` payload. With ``METRICS_ENABLED=0`` every call returns
+immediately, so the instrumentation can stay in hot paths. Synthesis worker
+processes ``drain`` their values after each task and the pool ``merge``s
+them into the parent.
+"""
+import os
+import threading
+import time
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') == '1'
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+AUDIO_BUCKETS = (1, 2, 5, 10, 20, 30, 60, 120, 300)
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def drain(self):
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values):
+        with self._lock:
+            for key, value in values.items():
+                self._values[key] = self._values.get(key, 0) + value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts, sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def drain(self):
+        with self._lock:
+            series, self._series = self._series, {}
+        return series
+
+    def merge(self, series):
+        with self._lock:
+            for key, (counts, total, count) in series.items():
+                target = self._series.get(key)
+                if target is None:
+                    target = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+                target[0] = [a + b for a, b in zip(target[0], counts)]
+                target[1] += total
+                target[2] += count
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.labelnames, key, ('le', f"{bound:g}"))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', '+Inf'))} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    'voiceforge_stage_seconds', 'Latency of each pipeline stage in seconds', ('operation', 'stage')
+)
+AUDIO_SECONDS = Histogram(
+    'voiceforge_audio_seconds', 'Duration of produced audio in seconds', ('operation',), buckets=AUDIO_BUCKETS
+)
+ERRORS = Counter('voiceforge_errors_total', 'Stages that raised an exception', ('operation', 'stage'))
+CACHE_LOOKUPS = Counter('voiceforge_cache_lookups_total', 'Cache lookups by cache and result', ('cache', 'result'))
+
+_METRICS = [STAGE_SECONDS, AUDIO_SECONDS, ERRORS, CACHE_LOOKUPS]
+
+
+def _reset_locks_after_fork():
+    # A child forked while another thread was recording would inherit a held lock
+    for metric in _METRICS:
+        metric._lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_locks_after_fork)
+
+
+class _Span:
+    __slots__ = ('operation', 'stage', 'start')
+
+    def __init__(self, operation, stage):
+        self.operation = operation
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        STAGE_SECONDS.observe(time.perf_counter() - self.start, operation=self.operation, stage=self.stage)
+        if exc_type is not None:
+            ERRORS.inc(operation=self.operation, stage=self.stage)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(operation, stage):
+    """
+    Times a stage of an operation; exceptions are counted and re-raised.
+
+        with metrics.span('clone_voice', 'synthesis'):
+            ...
+    """
+    if not METRICS_ENABLED:
+        return _NOOP_SPAN
+    return _Span(operation, stage)
+
+
+def record_cache(cache, hit):
+    if METRICS_ENABLED:
+        CACHE_LOOKUPS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+def record_audio(operation, seconds):
+    if METRICS_ENABLED:
+        AUDIO_SECONDS.observe(seconds, operation=operation)
+
+
+def record_error(operation, stage):
+    if METRICS_ENABLED:
+        ERRORS.inc(operation=operation, stage=stage)
+
+
+def drain():
+    """
+    Takes every value recorded in this process and clears it, so a worker
+    process can hand its measurements to the process serving ``/metrics``.
+    """
+    return [metric.drain() for metric in _METRICS]
+
+
+def merge(snapshot):
+    """Adds a ``drain`` snapshot taken in another process."""
+    for metric, values in zip(_METRICS, snapshot):
+        metric.merge(values)
+
+
+def render():
+    """Returns every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,119 @@
+import contextlib
+import logging
+import os
+
+import torch
+from torch import nn
+from TTS.api import TTS
+from TTS.tts.configs.xtts_config import XttsConfig
+from TTS.tts.models import xtts as xtts_module
+from TTS.tts.models.xtts import Xtts
+
+logger = logging.getLogger(__name__)
+
+XTTS_MODEL_NAME = "tts_models/multilingual/multi-dataset/xtts_v2"
+
+# Directory holding config.json, model.pth, vocab.json and speakers_xtts.pth of a local XTTS v2 copy
+XTTS_MODEL_PATH = os.getenv("XTTS_MODEL_PATH")
+XTTS_MMAP = os.getenv("XTTS_MMAP", "0") == "1"
+
+# CPU inference tuning: dynamic int8 quantization and intra-/inter-op thread counts (0 keeps torch's default)
+XTTS_QUANTIZE = os.getenv("XTTS_QUANTIZE", "0") == "1"
+XTTS_NUM_THREADS = int(os.getenv("XTTS_NUM_THREADS", "0"))
+XTTS_INTEROP_THREADS = int(os.getenv("XTTS_INTEROP_THREADS", "0"))
+
+
+@contextlib.contextmanager
+def _mmap_checkpoint_loading():
+    # Xtts.load_checkpoint reads model.pth through load_fsspec, which hands torch.load a
+    # file object; mmap needs the path, so swap in a path-based loader while loading
+    original = xtts_module.load_fsspec
+
+    def load_mmap(path, map_location=None, **kwargs):
+        return torch.load(path, map_location=map_location, mmap=True, weights_only=False)
+
+    xtts_module.load_fsspec = load_mmap
+    try:
+        yield
+    finally:
+        xtts_module.load_fsspec = original
+
+
+def configure_threads(num_threads=0, interop_threads=0):
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    if interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError as e:
+            # Only settable before the first inter-op parallel work in the process
+            logger.warning(f"Could not set inter-op threads: {str(e)}")
+    logger.info(f"Torch threads: intra-op={torch.get_num_threads()}, inter-op={torch.get_num_interop_threads()}")
+
+
+def _conv1d_to_linear(module):
+    # GPT-2 blocks use transformers' Conv1D (weight stored as in x out), which dynamic
+    # quantization does not recognise; swap in an equivalent nn.Linear
+    for name, child in module.named_children():
+        if type(child).__name__ == "Conv1D" and hasattr(child, "nf"):
+            in_features, out_features = child.weight.shape
+            linear = nn.Linear(in_features, out_features)
+            linear.weight = nn.Parameter(child.weight.detach().t().contiguous(), requires_grad=False)
+            linear.bias = nn.Parameter(child.bias.detach().clone(), requires_grad=False)
+            setattr(module, name, linear)
+        else:
+            _conv1d_to_linear(child)
+
+
+def quantize_int8(tts_model):
+    """
+    Applies dynamic int8 quantization to the linear layers of the GPT and decoder, in place.
+
+    Only meaningful for CPU inference; weights are stored as int8 and
+    activations are quantized on the fly per batch.
+    """
+    _conv1d_to_linear(tts_model.gpt)
+    torch.ao.quantization.quantize_dynamic(tts_model.gpt, {nn.Linear}, dtype=torch.qint8, inplace=True)
+    torch.ao.quantization.quantize_dynamic(tts_model.hifigan_decoder, {nn.Linear}, dtype=torch.qint8, inplace=True)
+    return tts_model
+
+
+def load_xtts(device, model_path=None, mmap=False, quantize=False, num_threads=0, interop_threads=0):
+    """
+    Loads XTTS v2 and returns the underlying ``Xtts`` model on ``device``.
+
+    Args:
+        device (str): Torch device to move the model to.
+        model_path (str): Local checkpoint directory. When None, the model is
+            resolved (and downloaded if needed) through the Coqui model manager.
+        mmap (bool): Memory-map ``model.pth`` instead of reading it into memory,
+            which lowers peak RSS while the weights are copied into the model.
+        quantize (bool): Apply dynamic int8 quantization (CPU only).
+        num_threads (int): Intra-op threads; 0 keeps torch's default.
+        interop_threads (int): Inter-op threads; 0 keeps torch's default.
+
+    Returns:
+        Xtts: The loaded model in eval mode.
+    """
+    configure_threads(num_threads, interop_threads)
+
+    if not model_path:
+        model = TTS(XTTS_MODEL_NAME, progress_bar=True).to(device).synthesizer.tts_model
+    else:
+        logger.info(f"Loading XTTS v2 from {model_path}{' (memory-mapped)' if mmap else ''}")
+        config = XttsConfig()
+        config.load_json(os.path.join(model_path, "config.json"))
+        model = Xtts.init_from_config(config)
+
+        loading = _mmap_checkpoint_loading() if mmap else contextlib.nullcontext()
+        with loading:
+            model.load_checkpoint(config, checkpoint_dir=model_path, eval=True)
+        model = model.to(device)
+
+    if quantize:
+        if device != "cpu":
+            logger.warning(f"Skipping int8 quantization: only supported on CPU, not {device}")
+        else:
+            logger.info("Applying dynamic int8 quantization")
+            quantize_int8(model)
+    return model
@@ -1,7 +1,14 @@
 import os
-from pydub import AudioSegment
+import argparse
+import glob
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import ExitStack
 import logging
 from pydub.exceptions import CouldntDecodeError
+import soundfile as sf
+
+from audio_buffer import AudioBuffer, iter_blocks
+import encoder
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -9,6 +16,42 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(
 # Supported formats
 SUPPORTED_FORMATS = ["mp3", "wav", "flac", "ogg", "aac", "m4a"]
 
+def transcode(input_file: str, outputs: list) -> None:
+    """
+    Decodes ``input_file`` block by block and encodes every block to each output.
+
+    Peak memory is one block per output regardless of the file's length.
+    wav and flac outputs keep the source's sample format (24-bit, float, ...)
+    where the container supports it.
+
+    Args:
+        input_file (str): Path to the input audio file.
+        outputs (list): ``(format, path)`` pairs to write.
+    """
+    try:
+        subtype = sf.info(input_file).subtype
+    except sf.LibsndfileError:
+        # Decoded through pydub, which yields 16-bit samples
+        subtype = None
+
+    with ExitStack() as stack:
+        writers = None
+        for block in iter_blocks(input_file, mono=False):
+            if writers is None:
+                writers = [
+                    stack.enter_context(encoder.FileWriter(path, block.sr, block.channels, fmt, subtype=subtype))
+                    for fmt, path in outputs
+                ]
+            for writer in writers:
+                writer.write(block.samples)
+
+    if writers is None:
+        # No frames to stream; still produce (empty) outputs with the input's layout
+        audio = AudioBuffer.from_file(input_file, mono=False)
+        for fmt, path in outputs:
+            encoder.write(audio.samples, audio.sr, path, fmt=fmt, subtype=subtype)
+
+
 def convert_audio(input_file: str, output_format: str, output_dir: str = "converted_audio") -> str:
     """
     Converts an audio file to the specified format.
@@ -38,17 +81,13 @@ def convert_audio(input_file: str, output_format: str, output_dir: str = "conver
         # Create output directory if it doesn't exist
         os.makedirs(output_dir, exist_ok=True)
 
-        # Load the input audio file
-        logging.info(f"Loading audio file: {input_file}")
-        audio = AudioSegment.from_file(input_file)
-
         # Generate output file path
         input_filename = os.path.splitext(os.path.basename(input_file))[0]
         output_file = os.path.join(output_dir, f"{input_filename}.{output_format.lower()}")
 
-        # Export the audio to the desired format
-        logging.info(f"Converting to {output_format.upper()}...")
-        audio.export(output_file, format=output_format.lower())
+        # Stream the input through the encoder; pydub is only involved for containers soundfile cannot read
+        logging.info(f"Converting {input_file} to {output_format.upper()}...")
+        transcode(input_file, [(output_format.lower(), output_file)])
         logging.info(f"Conversion successful! File saved as: {output_file}")
 
         return output_file
@@ -63,10 +102,164 @@ def convert_audio(input_file: str, output_format: str, output_dir: str = "conver
         logging.error(f"An unexpected error occurred: {e}")
         raise
 
+def convert_to_formats(input_file: str, output_formats: list, output_dir: str = "converted_audio") -> list:
+    """
+    Decodes an audio file once and encodes it to every requested format.
+
+    Args:
+        input_file (str): Path to the input audio file.
+        output_formats (list): Desired output formats (e.g., ["mp3", "ogg"]).
+        output_dir (str): Directory to save the converted files.
+
+    Returns:
+        list: Paths to the converted audio files, in the order of output_formats.
+
+    Raises:
+        ValueError: If the input file or any output format is invalid.
+        CouldntDecodeError: If the input file cannot be decoded.
+    """
+    if not os.path.isfile(input_file):
+        raise ValueError(f"Input file '{input_file}' does not exist.")
+
+    output_formats = [fmt.lower() for fmt in output_formats]
+    unsupported = [fmt for fmt in output_formats if fmt not in SUPPORTED_FORMATS]
+    if unsupported:
+        raise ValueError(f"Unsupported output format(s): {unsupported}. Supported formats: {SUPPORTED_FORMATS}")
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    input_filename = os.path.splitext(os.path.basename(input_file))[0]
+
+    output_files = []
+    outputs = []
+    for output_format in output_formats:
+        output_file = os.path.join(output_dir, f"{input_filename}.{output_format}")
+        # Never re-encode a file over itself
+        if os.path.abspath(output_file) != os.path.abspath(input_file):
+            outputs.append((output_format, output_file))
+        output_files.append(output_file)
+
+    # One streamed decode feeds every target format
+    if outputs:
+        transcode(input_file, outputs)
+    return output_files
+
+
+def collect_inputs(inputs: list) -> list:
+    """
+    Expands directories and glob patterns into a sorted list of audio files.
+    """
+    files = set()
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            candidates = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+        else:
+            candidates = glob.glob(pattern, recursive=True)
+        for path in candidates:
+            extension = os.path.splitext(path)[1].lstrip(".").lower()
+            if os.path.isfile(path) and extension in SUPPORTED_FORMATS:
+                files.add(path)
+    return sorted(files)
+
+
+def plan_output_dirs(files: list, output_dir: str) -> dict:
+    """
+    Chooses an output directory per input that mirrors its path below the inputs' common root.
+
+    Files with the same name in different directories therefore land in
+    different subdirectories instead of overwriting each other.
+
+    Raises:
+        ValueError: If two inputs would still produce the same output stem
+            (e.g. ``a.wav`` and ``a.mp3`` in one directory).
+    """
+    directories = [os.path.dirname(os.path.abspath(path)) for path in files]
+    root = os.path.commonpath(directories)
+
+    plan, stems = {}, {}
+    for path, directory in zip(files, directories):
+        target_dir = os.path.normpath(os.path.join(output_dir, os.path.relpath(directory, root)))
+        stem = os.path.join(target_dir, os.path.splitext(os.path.basename(path))[0])
+        if stem in stems:
+            raise ValueError(f"'{stems[stem]}' and '{path}' would both be converted to {stem}.*")
+        stems[stem] = path
+        plan[path] = target_dir
+    return plan
+
+
+def convert_batch(inputs: list, output_formats: list, output_dir: str = "converted_audio", max_workers: int = None) -> dict:
+    """
+    Converts many files to several formats in parallel across processes.
+
+    Each input is decoded once in a worker process and fanned out to all
+    target formats, with one worker per CPU core by default.
+
+    Args:
+        inputs (list): Files, directories or glob patterns to convert.
+        output_formats (list): Desired output formats.
+        output_dir (str): Directory to save the converted files; input
+            subdirectories are mirrored below it.
+        max_workers (int): Number of worker processes. Defaults to the core count.
+
+    Returns:
+        dict: Maps each input file to its list of output paths, or to the
+        exception raised while converting it.
+
+    Raises:
+        ValueError: If two inputs would overwrite each other's outputs.
+    """
+    files = collect_inputs(inputs)
+    if not files:
+        logging.warning(f"No audio files matched {inputs}")
+        return {}
+    output_dirs = plan_output_dirs(files, output_dir)
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(files))
+    logging.info(f"Converting {len(files)} files to {', '.join(output_formats)} with {max_workers} workers")
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(convert_to_formats, input_file, output_formats, output_dirs[input_file]): input_file
+            for input_file in files
+        }
+        for future in as_completed(futures):
+            input_file = futures[future]
+            try:
+                results[input_file] = future.result()
+                logging.info(f"Converted {input_file}")
+            except Exception as e:
+                logging.error(f"Failed to convert {input_file}: {e}")
+                results[input_file] = e
+    return results
+
+
 def main():
     """
     Main function to handle user input and perform audio conversion.
+
+    With command-line arguments, runs a batch conversion instead, e.g.
+    ``python output.py output/ --formats mp3 ogg --output-dir delivery``.
     """
+    parser = argparse.ArgumentParser(description="Convert audio files between formats.")
+    parser.add_argument("inputs", nargs="*", help="Files, directories or glob patterns to convert")
+    parser.add_argument("--formats", nargs="+", default=["mp3"], help=f"Target formats ({', '.join(SUPPORTED_FORMATS)})")
+    parser.add_argument("--output-dir", default="converted_audio", help="Directory to save converted files")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (defaults to the core count)")
+    args = parser.parse_args()
+
+    if args.inputs:
+        try:
+            results = convert_batch(args.inputs, args.formats, args.output_dir, args.workers)
+        except ValueError as e:
+            print(f"\nError: {e}")
+            return
+        failed = [input_file for input_file, result in results.items() if isinstance(result, Exception)]
+        print(f"\nConverted {len(results) - len(failed)} of {len(results)} files into {args.output_dir}")
+        if failed:
+            print(f"Failed: {', '.join(failed)}")
+        return
+
     print("=== Audio File Converter ===")
     print(f"Supported formats: {', '.join(SUPPORTED_FORMATS)}")
 
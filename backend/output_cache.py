@@ -0,0 +1,200 @@
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import weakref
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: eviction is only coordinated between threads of one process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+# Live caches, so a forked synthesis worker can replace locks another thread held at fork time
+_instances = weakref.WeakSet()
+
+
+def _reset_locks_after_fork():
+    for cache in list(_instances):
+        cache._lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_locks_after_fork)
+
+
+def cache_key(params):
+    """
+    Canonical hash of synthesis parameters.
+
+    Args:
+        params (dict): JSON-serializable parameters; key order does not matter.
+
+    Returns:
+        str: Hex SHA-256 of the canonical JSON encoding.
+    """
+    canonical = json.dumps(params, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class OutputCache:
+    """
+    Content-addressed cache of rendered audio files with size-bounded LRU eviction.
+
+    Files are stored as ``{key}.{ext}`` in ``cache_dir``, which may be shared
+    by several processes (server, synthesis workers). Recency is the file
+    modification time, refreshed on every hit, and eviction rescans the
+    directory under an exclusive file lock, so ``max_bytes`` (and the optional
+    ``max_entries``) bound the directory as a whole rather than each process's
+    view of it.
+    """
+
+    def __init__(self, cache_dir, max_bytes=1024 * 1024 * 1024, max_entries=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+
+        self._index = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        _instances.add(self)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._lock_path = os.path.join(self.cache_dir, ".lock")
+        with self._lock:
+            self._evict()
+
+    def _scan(self):
+        # Caller holds the directory lock; rebuilds the index, oldest first
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            key, ext = os.path.splitext(name)
+            if not ext or name.endswith(".part") or not os.path.isfile(path):
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # Evicted by another process while listing
+                continue
+            entries.append((stat.st_mtime, key, path, stat.st_size))
+
+        self._index.clear()
+        self._bytes = 0
+        for _, key, path, size in sorted(entries):
+            self._index[key] = (path, size)
+            self._bytes += size
+
+    @contextlib.contextmanager
+    def _dir_lock(self):
+        # Serializes eviction between every process sharing cache_dir
+        if fcntl is None:
+            yield
+            return
+        with open(self._lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def path_for(self, key, ext):
+        return os.path.join(self.cache_dir, f"{key}.{ext}")
+
+    def get(self, key, ext=None):
+        """
+        Returns the cached file path for ``key``, or None on a miss.
+
+        With ``ext``, a ``{key}.{ext}`` file written by another process since
+        the last rescan is found as well.
+        """
+        with self._lock:
+            entry = self._index.get(key)
+            path = entry[0] if entry else (self.path_for(key, ext) if ext else None)
+            if path:
+                try:
+                    # The modification time is the recency every process evicts by
+                    os.utime(path)
+                except OSError:
+                    pass
+                else:
+                    if entry is None:
+                        entry = self._index[key] = (path, os.path.getsize(path))
+                        self._bytes += entry[1]
+                    self._index.move_to_end(key)
+                    self.hits += 1
+                    return path
+
+            if entry:
+                # Removed behind our back (e.g. by the janitor or another process)
+                del self._index[key]
+                self._bytes -= entry[1]
+            self.misses += 1
+            return None
+
+    def add(self, key, path):
+        """Registers a file already written at ``path_for(key, ext)``."""
+        with self._lock:
+            self._evict(keep=key)
+        return path
+
+    def put(self, key, src_path):
+        """Moves ``src_path`` into the cache and returns its new path."""
+        ext = os.path.splitext(src_path)[1].lstrip(".")
+        path = self.path_for(key, ext)
+        os.replace(src_path, path)
+        return self.add(key, path)
+
+    def copy_to(self, key, dest_path, ext=None):
+        """Copies a cached entry to ``dest_path``; returns False on a miss."""
+        path = self.get(key, ext)
+        if path is None:
+            return False
+        shutil.copyfile(path, dest_path)
+        return True
+
+    def _over_budget(self):
+        return self._bytes > self.max_bytes or (self.max_entries is not None and len(self._index) > self.max_entries)
+
+    def _evict(self, keep=None):
+        # Caller holds the lock. Usage is recomputed from the directory, since
+        # other processes add (and evict) entries in it too
+        with self._dir_lock():
+            self._scan()
+            while self._over_budget() and len(self._index) > (1 if keep else 0):
+                key, (path, size) = next(iter(self._index.items()))
+                if key == keep:
+                    self._index.move_to_end(key)
+                    continue
+                del self._index[key]
+                self._bytes -= size
+                self.evictions += 1
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                logger.debug(f"Evicted cached output {key[:12]}")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._index),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,133 @@
+import logging
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+from output_cache import OutputCache, cache_key
+from text_utils import normalize_sentence
+
+logger = logging.getLogger(__name__)
+
+
+# Live caches, so a forked synthesis worker can replace locks another thread held at fork time
+_instances = weakref.WeakSet()
+
+
+def _reset_locks_after_fork():
+    for cache in list(_instances):
+        cache._lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_locks_after_fork)
+
+
+class PhraseCache:
+    """
+    Cache of raw synthesized waveforms for single sentences.
+
+    Keyed on the speaker, the normalized sentence and the synthesis settings,
+    so stock sentences (greetings, disclaimers, sign-offs) are rendered once
+    per voice and reused across scripts. Waveforms are stored before emotion
+    effects, which run over the assembled script. Entries live in an
+    in-memory LRU bounded by bytes (per process), backed by ``{key}.npy``
+    files in ``cache_dir``. The disk tier is an ``OutputCache``, so its size
+    bound holds for the directory as a whole when several processes share it.
+    """
+
+    def __init__(self, cache_dir="phrase_cache", max_bytes=128 * 1024 * 1024, max_disk_bytes=1024 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        _instances.add(self)
+        self._disk = OutputCache(cache_dir, max_bytes=max_disk_bytes) if cache_dir else None
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key_for(speaker_key, sentence, language, speed, emotion):
+        return cache_key({
+            "speaker": speaker_key,
+            "sentence": normalize_sentence(sentence),
+            "language": language,
+            "speed": round(float(speed), 4),
+            "emotion": emotion,
+        })
+
+    def _remember(self, key, wav):
+        # Caller holds the lock
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key).nbytes
+        self._entries[key] = wav
+        self._bytes += wav.nbytes
+
+        while len(self._entries) > 1 and self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def get(self, key):
+        """Returns the cached float32 waveform for ``key``, or None on a miss."""
+        with self._lock:
+            wav = self._entries.get(key)
+            if wav is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return wav
+
+        # Also finds sentences rendered by other processes sharing the directory
+        path = self._disk.get(key, "npy") if self._disk else None
+        if path:
+            try:
+                wav = np.load(path)
+            except Exception as e:
+                logger.warning(f"Discarding unreadable phrase cache entry {key[:12]}: {str(e)}")
+                os.remove(path)
+            else:
+                wav.flags.writeable = False
+                with self._lock:
+                    self._remember(key, wav)
+                    self.hits += 1
+                    self.disk_hits += 1
+                return wav
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, wav):
+        # Shared between requests, so cached arrays are made read-only
+        wav = np.array(wav, dtype=np.float32)
+        wav.flags.writeable = False
+        with self._lock:
+            self._remember(key, wav)
+
+        if self._disk:
+            path = self._disk.path_for(key, "npy")
+            # Write to a temp name first so a crash never leaves a truncated entry behind
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+            with open(tmp_path, "wb") as f:
+                np.save(f, wav)
+            os.replace(tmp_path, path)
+            self._disk.add(key, path)
+        return wav
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "disk": self._disk.stats() if self._disk else None,
+            }
@@ -0,0 +1,93 @@
+import logging
+import queue
+import threading
+
+from text_utils import SentenceBuffer
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+
+def speak_stream(text_chunks, synthesize, lookahead=2):
+    """
+    Synthesizes streamed text sentence by sentence and yields the audio in order.
+
+    A producer thread reads ``text_chunks`` (e.g. LLM tokens) and dispatches
+    each sentence to synthesis as soon as it is complete, so generation and
+    synthesis overlap. Up to ``lookahead`` sentences synthesize at once; their
+    audio is buffered and released strictly in script order. Closing the
+    generator (e.g. on client disconnect) stops both stages.
+
+    Args:
+        text_chunks (iterable[str]): Text as it is produced.
+        synthesize (callable): Takes a sentence and returns an iterator of audio bytes.
+        lookahead (int): Sentences allowed to synthesize ahead of playback.
+
+    Yields:
+        bytes: Audio chunks in sentence order.
+    """
+    ordered = queue.Queue()
+    slots = threading.Semaphore(max(1, lookahead))
+    stop = threading.Event()
+
+    def synthesize_sentence(sentence, output):
+        try:
+            for chunk in synthesize(sentence):
+                if stop.is_set():
+                    return
+                output.put(chunk)
+        except Exception as e:
+            output.put(e)
+        finally:
+            output.put(_END)
+
+    def produce():
+        sentences = SentenceBuffer()
+
+        def dispatch(sentence):
+            # Wait for a free slot, checking periodically whether the consumer went away
+            while not slots.acquire(timeout=0.5):
+                if stop.is_set():
+                    return False
+            output = queue.Queue()
+            ordered.put(output)
+            threading.Thread(target=synthesize_sentence, args=(sentence, output), daemon=True).start()
+            return True
+
+        try:
+            for chunk in text_chunks:
+                for sentence in sentences.feed(chunk):
+                    if not dispatch(sentence):
+                        return
+                if stop.is_set():
+                    return
+            for sentence in sentences.flush():
+                if not dispatch(sentence):
+                    return
+        except Exception as e:
+            ordered.put(e)
+        finally:
+            ordered.put(_END)
+
+    producer = threading.Thread(target=produce, name="pipeline-producer", daemon=True)
+    producer.start()
+
+    try:
+        while True:
+            output = ordered.get()
+            if output is _END:
+                return
+            if isinstance(output, Exception):
+                raise output
+
+            while True:
+                chunk = output.get()
+                if chunk is _END:
+                    break
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+            slots.release()
+    finally:
+        stop.set()
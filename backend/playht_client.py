@@ -0,0 +1,68 @@
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Timeouts in seconds; the read timeout bounds the gap between streamed chunks, not the whole clip
+CONNECT_TIMEOUT = float(os.getenv('PLAYHT_CONNECT_TIMEOUT', '5'))
+READ_TIMEOUT = float(os.getenv('PLAYHT_READ_TIMEOUT', '60'))
+TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+MAX_RETRIES = int(os.getenv('PLAYHT_MAX_RETRIES', '3'))
+BACKOFF_FACTOR = float(os.getenv('PLAYHT_BACKOFF_FACTOR', '0.5'))
+POOL_SIZE = int(os.getenv('PLAYHT_POOL_SIZE', '16'))
+
+STREAM_CHUNK_SIZE = 16 * 1024
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Returns the shared keep-alive session used for every Play.ht call.
+
+    Connection errors and 429/5xx responses are retried with exponential
+    backoff, honouring ``Retry-After``.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                retry = Retry(
+                    total=MAX_RETRIES,
+                    backoff_factor=BACKOFF_FACTOR,
+                    status_forcelist=(429, 500, 502, 503, 504),
+                    allowed_methods=frozenset(["GET", "POST"]),
+                    respect_retry_after_header=True,
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def tee_to_file(chunks, output_file):
+    """
+    Yields ``chunks`` unchanged while writing them to ``output_file``.
+
+    Data goes to a ``.part`` file that is renamed into place only once the
+    stream completes, so an aborted stream never leaves a truncated output.
+    """
+    part_path = f"{output_file}.part"
+    completed = False
+    try:
+        with open(part_path, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                yield chunk
+        os.replace(part_path, output_file)
+        completed = True
+    finally:
+        if not completed and os.path.exists(part_path):
+            os.remove(part_path)
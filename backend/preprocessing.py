@@ -0,0 +1,162 @@
+import librosa
+import numpy as np
+
+from audio_buffer import AudioBuffer
+
+# Frame size used for silence detection, matching pydub's 10ms seek step granularity
+SILENCE_FRAME_MS = 10
+
+# Reference recordings are cleaned this many seconds at a time
+REFERENCE_BLOCK_SECONDS = 30
+
+# Part of the speaker cache namespaces of both cloners (emotion.py, xttv.py); bump
+# whenever either preprocess_audio changes so latents computed by an older
+# pipeline are not served from disk
+PREPROCESS_VERSION = 3
+
+
+def load_mono(input_wav, sr=None):
+    """Decodes an audio file once into a float32 mono waveform, resampling only if ``sr`` is given."""
+    buffer = AudioBuffer.from_file(input_wav)
+    if sr is None or sr == buffer.sr:
+        return buffer.samples, buffer.sr
+    return librosa.resample(buffer.samples, orig_sr=buffer.sr, target_sr=sr), sr
+
+
+def normalize(audio, peak=1.0):
+    """Scales a waveform so its absolute peak equals ``peak``."""
+    max_abs = np.max(np.abs(audio)) if len(audio) else 0.0
+    if max_abs == 0:
+        return audio
+    return (audio * (peak / max_abs)).astype(np.float32)
+
+
+def _frames(audio, n_fft, hop_length):
+    # Reflect-pad like librosa's centred STFT, then view as overlapping frames without copying
+    padded = np.pad(audio, n_fft // 2, mode="reflect")
+    num_frames = 1 + (len(padded) - n_fft) // hop_length
+    return np.lib.stride_tricks.as_strided(
+        padded,
+        shape=(num_frames, n_fft),
+        strides=(padded.strides[0] * hop_length, padded.strides[0]),
+        writeable=False,
+    )
+
+
+def spectral_gate(audio, sr, n_fft=1024, hop_length=256, n_std_thresh=1.5, prop_decrease=1.0,
+                  noise_percentile=10, smooth_bins=3):
+    """
+    Stationary spectral-gating noise reduction.
+
+    The noise profile is estimated from the quietest ``noise_percentile`` of
+    frames, so no separate noise clip is needed. Bins that stay below the
+    profile mean plus ``n_std_thresh`` standard deviations (in dB) are
+    attenuated by ``prop_decrease``.
+
+    Args:
+        audio (np.ndarray): Float mono waveform.
+        sr (int): Sample rate (unused beyond documenting the input rate).
+        n_fft (int): FFT size.
+        hop_length (int): Hop between frames.
+        n_std_thresh (float): Threshold above the noise mean, in standard deviations.
+        prop_decrease (float): Fraction of gated energy to remove (0-1).
+        noise_percentile (float): Share of quietest frames used as the noise profile.
+        smooth_bins (int): Width of the frequency smoothing applied to the mask.
+
+    Returns:
+        np.ndarray: Denoised float32 waveform of the same length.
+    """
+    if len(audio) <= n_fft:
+        return audio
+
+    window = np.hanning(n_fft + 1)[:-1].astype(np.float32)
+    spectrum = np.fft.rfft(_frames(audio, n_fft, hop_length) * window, axis=1)
+    magnitude_db = 20 * np.log10(np.abs(spectrum) + 1e-10)
+
+    frame_energy = magnitude_db.mean(axis=1)
+    noise_frames = magnitude_db[frame_energy <= np.percentile(frame_energy, noise_percentile)]
+    threshold = noise_frames.mean(axis=0) + n_std_thresh * noise_frames.std(axis=0)
+
+    mask = (magnitude_db > threshold).astype(np.float32)
+    if smooth_bins > 1:
+        # Moving average across frequency via a cumulative sum
+        left = smooth_bins // 2
+        padded = np.pad(mask, ((0, 0), (left + 1, smooth_bins - 1 - left)), mode="edge")
+        padded[:, 0] = 0
+        cumulative = np.cumsum(padded, axis=1)
+        mask = (cumulative[:, smooth_bins:] - cumulative[:, :-smooth_bins]) / smooth_bins
+    gain = 1.0 - prop_decrease * (1.0 - mask)
+
+    frames = (np.fft.irfft(spectrum * gain, n=n_fft, axis=1) * window).astype(np.float32)
+    return _overlap_add(frames, window, hop_length, len(audio))
+
+
+def _overlap_add(frames, window, hop_length, length):
+    num_frames, n_fft = frames.shape
+    total = (num_frames - 1) * hop_length + n_fft
+    output = np.zeros(total, dtype=np.float32)
+    window_sum = np.zeros(total, dtype=np.float32)
+
+    if n_fft % hop_length == 0:
+        # Each frame spans n_fft / hop_length hop-sized blocks; add one block column at a time
+        overlap = n_fft // hop_length
+        blocks = frames.reshape(num_frames, overlap, hop_length)
+        out_blocks = output.reshape(-1, hop_length)
+        sum_blocks = window_sum.reshape(-1, hop_length)
+        window_blocks = (window ** 2).reshape(overlap, hop_length)
+        for r in range(overlap):
+            out_blocks[r:r + num_frames] += blocks[:, r]
+            sum_blocks[r:r + num_frames] += window_blocks[r]
+    else:
+        for i in range(num_frames):
+            output[i * hop_length:i * hop_length + n_fft] += frames[i]
+            window_sum[i * hop_length:i * hop_length + n_fft] += window ** 2
+
+    output /= np.maximum(window_sum, 1e-8)
+    pad = n_fft // 2
+    return output[pad:pad + length]
+
+
+def trim_silence(audio, sr, min_silence_len=500, silence_thresh=-40, keep_silence=100):
+    """
+    Removes silent stretches using frame energy, like pydub's ``split_on_silence``
+    followed by joining the chunks.
+
+    Args:
+        audio (np.ndarray): Float mono waveform in [-1, 1].
+        sr (int): Sample rate.
+        min_silence_len (int): Minimum silence length to remove, in ms.
+        silence_thresh (float): Frames quieter than this (dBFS) count as silent.
+        keep_silence (int): Silence kept on each side of speech, in ms.
+
+    Returns:
+        np.ndarray: Waveform with long silences removed.
+    """
+    frame_len = max(1, sr * SILENCE_FRAME_MS // 1000)
+    num_frames = len(audio) // frame_len
+    if num_frames == 0:
+        return audio
+
+    framed = audio[:num_frames * frame_len].reshape(num_frames, frame_len)
+    rms = np.sqrt(np.mean(framed.astype(np.float64) ** 2, axis=1))
+    silent = 20 * np.log10(rms + 1e-10) < silence_thresh
+
+    # Start/end frame indices of each silent run
+    edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    min_frames = int(np.ceil(min_silence_len / SILENCE_FRAME_MS))
+    keep = np.ones(len(audio), dtype=bool)
+    keep_samples = sr * keep_silence // 1000
+    for start, end in zip(starts, ends):
+        if end - start < min_frames:
+            continue
+        cut_start = start * frame_len + (keep_samples if start > 0 else 0)
+        cut_end = (end * frame_len if end < num_frames else len(audio)) - (keep_samples if end < num_frames else 0)
+        if cut_end > cut_start:
+            keep[cut_start:cut_end] = False
+
+    if not keep.any():
+        return audio
+    return audio[keep]
@@ -0,0 +1,152 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted to a scheduler whose queue is at capacity."""
+
+
+class _Job:
+    __slots__ = ("batch_key", "payload", "future", "enqueued_at")
+
+    def __init__(self, batch_key, payload):
+        self.batch_key = batch_key
+        self.payload = payload
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+def _chain(source, target):
+    error = source.exception()
+    if error is not None:
+        target.set_exception(error)
+    else:
+        target.set_result(source.result())
+
+
+class BatchScheduler:
+    """
+    Single worker thread that groups compatible jobs into micro-batches.
+
+    Jobs with equal ``batch_key`` are collected until ``max_batch_size`` of them
+    are waiting or the oldest has waited ``max_wait`` seconds, then handed to
+    ``process_batch`` together. Jobs are served in arrival order of the oldest
+    waiting job, so one busy key cannot starve the others.
+    """
+
+    def __init__(self, process_batch, max_batch_size=8, max_wait=0.05, max_queue_size=0, name="batch-scheduler"):
+        """
+        Args:
+            process_batch (callable): Called with a list of payloads sharing a
+                batch key; must return a list of results in the same order. A
+                result may itself be a ``Future`` (e.g. from a worker pool), in
+                which case the job resolves when it does and the scheduler moves
+                on to the next batch without waiting.
+            max_batch_size (int): Upper bound on jobs per batch.
+            max_wait (float): Seconds the oldest job may wait for companions.
+            max_queue_size (int): Pending job limit; 0 means unbounded.
+        """
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self.max_queue_size = max_queue_size
+
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._stopped = False
+
+        self.batches = 0
+        self.jobs = 0
+
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    def submit(self, batch_key, payload):
+        """
+        Queues a job and returns a ``Future`` resolved with its result.
+
+        Raises:
+            QueueFullError: If ``max_queue_size`` jobs are already pending.
+        """
+        job = _Job(batch_key, payload)
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("Scheduler has been shut down")
+            if self.max_queue_size and len(self._pending) >= self.max_queue_size:
+                raise QueueFullError(f"{len(self._pending)} jobs already pending")
+            self._pending.append(job)
+            self._cond.notify()
+        return job.future
+
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+
+    def shutdown(self, wait=True):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if wait:
+            self._worker.join()
+
+    def _matching(self, batch_key):
+        return sum(1 for job in self._pending if job.batch_key == batch_key)
+
+    def _take_batch(self):
+        # Caller holds the condition
+        while not self._pending:
+            if self._stopped:
+                return None
+            self._cond.wait()
+
+        head = self._pending[0]
+        deadline = head.enqueued_at + self.max_wait
+        while not self._stopped and self._matching(head.batch_key) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._cond.wait(remaining)
+
+        batch, rest = [], deque()
+        for job in self._pending:
+            if job.batch_key == head.batch_key and len(batch) < self.max_batch_size:
+                batch.append(job)
+            else:
+                rest.append(job)
+        self._pending = rest
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                batch = self._take_batch()
+            if batch is None:
+                return
+
+            # Skip jobs whose callers already gave up
+            batch = [job for job in batch if job.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            self.batches += 1
+            self.jobs += len(batch)
+            try:
+                results = self.process_batch([job.payload for job in batch])
+            except Exception as e:
+                logger.error(f"Batch of {len(batch)} failed: {str(e)}")
+                for job in batch:
+                    job.future.set_exception(e)
+                continue
+
+            for job, result in zip(batch, results):
+                if isinstance(result, Future):
+                    result.add_done_callback(lambda done, job=job: _chain(done, job.future))
+                elif isinstance(result, Exception):
+                    job.future.set_exception(result)
+                else:
+                    job.future.set_result(result)
@@ -0,0 +1,395 @@
+import base64
+import json
+import os
+import threading
+import uuid
+
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
+from flask_cors import CORS
+from werkzeug.utils import secure_filename
+
+from emotion import VoiceCloner
+from scheduler import BatchScheduler, QueueFullError
+import effects
+import encoder
+from uploads import UPLOAD_MAX_BYTES, UploadError, save_upload
+from janitor import Janitor
+import metrics
+from worker_pool import SynthesisWorkerPool
+
+app = Flask(__name__)
+CORS(app)  # Enable CORS for all routes
+app.config['MAX_CONTENT_LENGTH'] = UPLOAD_MAX_BYTES + 1024 * 1024
+
+UPLOAD_FOLDER = 'uploads'
+OUTPUT_FOLDER = 'output'
+os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+
+# Generated audio is immutable (unique or content-addressed names), so clients may cache it for good
+AUDIO_MAX_AGE = 365 * 24 * 3600
+
+# Retention for uploads/ and output/; the output cache subdirectory keeps its own size budget
+RETENTION_HOURS = float(os.getenv('RETENTION_HOURS', '24'))
+UPLOADS_QUOTA_BYTES = int(os.getenv('UPLOADS_QUOTA_MB', '1024')) * 1024 * 1024
+OUTPUT_QUOTA_BYTES = int(os.getenv('OUTPUT_QUOTA_MB', '2048')) * 1024 * 1024
+janitor = Janitor(interval=float(os.getenv('JANITOR_INTERVAL', '300')))
+janitor.add(UPLOAD_FOLDER, max_age=RETENTION_HOURS * 3600, max_bytes=UPLOADS_QUOTA_BYTES)
+janitor.add(OUTPUT_FOLDER, max_age=RETENTION_HOURS * 3600, max_bytes=OUTPUT_QUOTA_BYTES)
+janitor.start()
+
+# Request coalescing, not batched inference: XTTS synthesizes one text per call,
+# so a batch only shares its speaker conditioning lookup. Waiting for companions
+# would add latency for no throughput, so by default only jobs already queued
+# together are grouped; the batch size caps how long other speakers wait
+# behind one speaker's jobs when synthesizing in this process.
+MAX_BATCH_SIZE = int(os.getenv('XTTS_MAX_BATCH_SIZE', '4'))
+MAX_WAIT_MS = float(os.getenv('XTTS_MAX_WAIT_MS', '0'))
+MAX_QUEUE_SIZE = int(os.getenv('XTTS_MAX_QUEUE_SIZE', '64'))
+REQUEST_TIMEOUT = float(os.getenv('XTTS_REQUEST_TIMEOUT', '300'))
+
+# /api/stream synthesizes on this process's model (serialized by xtts_utils.INFERENCE_LOCK);
+# beyond this many open streams new ones are turned away instead of queueing without bound
+MAX_STREAMS = int(os.getenv('XTTS_MAX_STREAMS', '2'))
+_stream_slots = threading.BoundedSemaphore(MAX_STREAMS)
+
+# Run a short synthesis at boot; /health only reports ready once it has finished
+XTTS_WARMUP = os.getenv('XTTS_WARMUP', '1') == '1'
+
+# Synthesis worker processes forked after the model loads (0 = synthesize in this process)
+XTTS_WORKERS = int(os.getenv('XTTS_WORKERS', '0'))
+XTTS_THREADS_PER_WORKER = int(os.getenv('XTTS_THREADS_PER_WORKER', '0'))
+
+# The XTTS model is loaded once per process, on first use
+_cloner = None
+_cloner_lock = threading.Lock()
+_load_error = None
+_worker_pool = None
+_ready = False
+_loader = None
+_loader_pid = None
+_loader_lock = threading.Lock()
+
+# With a worker pool, segmented scripts are driven from this process so their
+# segments can be spread over every worker instead of running inside one
+_segmented_jobs = ThreadPoolExecutor(max_workers=max(1, XTTS_WORKERS), thread_name_prefix='xtts-segmented')
+
+
+def get_cloner():
+    global _cloner, _worker_pool, _ready
+    if _cloner is None:
+        with _cloner_lock:
+            if _cloner is None:
+                # With a worker pool, warm-up runs inside each worker instead; the parent
+                # forks before doing any inference of its own
+                cloner = VoiceCloner(warmup=XTTS_WARMUP and not XTTS_WORKERS)
+                if XTTS_WORKERS:
+                    _worker_pool = SynthesisWorkerPool(
+                        cloner,
+                        num_workers=XTTS_WORKERS,
+                        threads_per_worker=XTTS_THREADS_PER_WORKER or None
+                    )
+                    if XTTS_WARMUP:
+                        _worker_pool.broadcast(warmup_worker)
+                    cloner.use_worker_pool(_worker_pool)
+                _cloner = cloner
+                _ready = True
+    return _cloner
+
+
+def is_ready():
+    return _ready
+
+
+def start_background_load():
+    """
+    Loads and warms the model off the request path, once per process.
+
+    Called at import so every way of serving the app (``python server.py``,
+    ``flask run``, gunicorn) starts loading right away, and again from
+    ``not_ready_response`` for processes forked after import (gunicorn
+    ``--preload``), whose copy of the loader thread did not survive the fork.
+    """
+    global _loader, _loader_pid
+    with _loader_lock:
+        if _loader is not None and _loader_pid == os.getpid():
+            return
+
+        def load():
+            global _load_error
+            try:
+                get_cloner()
+            except Exception as e:
+                _load_error = str(e)
+
+        _loader = threading.Thread(target=load, name='xtts-loader', daemon=True)
+        _loader_pid = os.getpid()
+        _loader.start()
+
+
+def _reset_loader_after_fork():
+    # A fork during loading copies _cloner_lock in its held state; give the child fresh locks
+    global _cloner_lock, _loader_lock
+    if _cloner is None:
+        _cloner_lock = threading.Lock()
+        _loader_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_loader_after_fork)
+
+
+def not_ready_response():
+    start_background_load()
+    response = jsonify({'error': 'Model is still loading, try again shortly'})
+    response.headers['Retry-After'] = '5'
+    return response, 503
+
+
+def warmup_worker(cloner):
+    cloner.warmup()
+
+
+def synthesize_job(cloner, job):
+    if not cloner.clone_voice(**job):
+        raise RuntimeError('Voice cloning failed')
+    return job['output_wav']
+
+
+def process_batch(jobs):
+    if _worker_pool is not None:
+        # Hand every short job to the least-loaded worker and fan segmented ones out
+        # from here; the returned futures let the scheduler move on meanwhile
+        cloner = get_cloner()
+        return [
+            _segmented_jobs.submit(synthesize_job, cloner, job) if cloner.is_segmented(job['text'])
+            else _worker_pool.submit(synthesize_job, job)
+            for job in jobs
+        ]
+
+    # Every job in a batch shares its speaker and language, so the conditioning
+    # lookup is paid once and the rest of the batch hits the in-memory cache.
+    # Synthesis itself still runs job by job: XTTS has no batched inference API
+    cloner = get_cloner()
+    cloner.get_speaker_latents(jobs[0]['speaker_wav'])
+
+    results = []
+    for job in jobs:
+        if cloner.clone_voice(**job):
+            results.append(job['output_wav'])
+        else:
+            results.append(RuntimeError('Voice cloning failed'))
+    return results
+
+
+scheduler = BatchScheduler(
+    process_batch,
+    max_batch_size=MAX_BATCH_SIZE,
+    max_wait=MAX_WAIT_MS / 1000.0,
+    max_queue_size=MAX_QUEUE_SIZE,
+    name='xtts-scheduler'
+)
+
+
+def save_sample(sample_file):
+    # Streams and validates the upload; raises UploadError for bad samples
+    unique_id = str(uuid.uuid4())
+    sample_name = secure_filename(f"{unique_id}_{os.path.splitext(sample_file.filename or 'sample')[0]}")
+    sample_path, _, _ = save_upload(sample_file, UPLOAD_FOLDER, sample_name)
+    return sample_path
+
+
+@app.route('/api/stream', methods=['POST'])
+def stream():
+    """
+    Streams synthesized speech sentence by sentence.
+
+    Returns chunked audio in ``format`` (wav by default; mp3, ogg, aac or m4a
+    are encoded on the fly), or Server-Sent Events carrying base64 PCM when the
+    client asks for ``text/event-stream`` (or passes ``transport=sse``).
+    """
+    if not is_ready():
+        return not_ready_response()
+
+    if 'sample_file' not in request.files:
+        return jsonify({'error': 'No sample_file part'}), 400
+
+    message = request.form.get('message', '')
+    if not message:
+        return jsonify({'error': 'No message provided'}), 400
+
+    language = request.form.get('language', 'hi')
+    emotion = request.form.get('emotion') or None
+    try:
+        speed = float(request.form.get('speed', 1.0))
+    except ValueError:
+        return jsonify({'error': 'speed must be a number'}), 400
+
+    output_format = request.form.get('format', 'wav').lower()
+    if output_format not in encoder.STREAM_FORMATS:
+        return jsonify({'error': f"format must be one of {encoder.STREAM_FORMATS}"}), 400
+
+    if not _stream_slots.acquire(blocking=False):
+        return jsonify({'error': 'Server is busy, try again later'}), 429
+    try:
+        sample_path = save_sample(request.files['sample_file'])
+        response = stream_response(sample_path, message, language, speed, emotion, output_format)
+    except UploadError as e:
+        _stream_slots.release()
+        return jsonify({'error': str(e)}), e.status
+    except Exception:
+        _stream_slots.release()
+        raise
+    # Released when the response is closed, including when the client disconnects
+    response.call_on_close(_stream_slots.release)
+    return response
+
+
+def stream_response(sample_path, message, language, speed, emotion, output_format):
+    cloner = get_cloner()
+    chunks = cloner.stream_audio(message, sample_path, language=language, speed=speed, emotion=emotion)
+
+    use_sse = (request.args.get('transport') == 'sse'
+               or request.accept_mimetypes.best == 'text/event-stream')
+
+    if use_sse:
+        def events():
+            yield f"event: start\ndata: {json.dumps({'sample_rate': cloner.sample_rate, 'encoding': 'pcm_s16le'})}\n\n"
+            try:
+                for chunk in chunks:
+                    pcm = effects.to_pcm16(chunk)
+                    yield f"event: audio\ndata: {base64.b64encode(pcm).decode('ascii')}\n\n"
+            except Exception as e:
+                yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+                return
+            yield "event: done\ndata: {}\n\n"
+
+        return Response(stream_with_context(events()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    stream_encoder = encoder.StreamEncoder(cloner.sample_rate, output_format)
+
+    def audio():
+        try:
+            for chunk in chunks:
+                data = stream_encoder.encode(chunk)
+                if data:
+                    yield data
+            yield stream_encoder.finish()
+        finally:
+            stream_encoder.close()
+
+    return Response(stream_with_context(audio()), mimetype=stream_encoder.mimetype,
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route('/api/synthesize', methods=['POST'])
+def synthesize():
+    if not is_ready():
+        return not_ready_response()
+
+    if 'sample_file' not in request.files:
+        return jsonify({'error': 'No sample_file part'}), 400
+
+    message = request.form.get('message', '')
+    if not message:
+        return jsonify({'error': 'No message provided'}), 400
+
+    language = request.form.get('language', 'hi')
+    emotion = request.form.get('emotion') or None
+    try:
+        speed = float(request.form.get('speed', 1.0))
+    except ValueError:
+        return jsonify({'error': 'speed must be a number'}), 400
+
+    output_format = request.form.get('output_format', 'wav').lower()
+    if output_format not in encoder.SUPPORTED_FORMATS:
+        return jsonify({'error': f"output_format must be one of {encoder.SUPPORTED_FORMATS}"}), 400
+
+    try:
+        sample_path = save_sample(request.files['sample_file'])
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+    speaker_key = get_cloner().speaker_cache.key_for(sample_path)
+
+    output_filename = f"{uuid.uuid4()}_output.{output_format}"
+    job = {
+        'text': message,
+        'speaker_wav': sample_path,
+        'output_wav': os.path.join(OUTPUT_FOLDER, output_filename),
+        'language': language,
+        'speed': speed,
+        'emotion': emotion,
+    }
+
+    try:
+        future = scheduler.submit((language, speaker_key), job)
+    except QueueFullError:
+        return jsonify({'error': 'Server is busy, try again later'}), 429
+
+    try:
+        future.result(timeout=REQUEST_TIMEOUT)
+    except FutureTimeoutError:
+        future.cancel()
+        return jsonify({'error': 'Synthesis timed out'}), 504
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    return jsonify({'success': True, 'audio_url': f"/api/audio/{output_filename}"})
+
+
+@app.route('/api/audio/<filename>')
+def get_audio(filename):
+    # Conditional responses give the player Range, ETag and Last-Modified support for seeking
+    response = send_from_directory(OUTPUT_FOLDER, filename, conditional=True, max_age=AUDIO_MAX_AGE)
+    response.headers['Cache-Control'] = f"public, max-age={AUDIO_MAX_AGE}, immutable"
+    return response
+
+
+@app.route('/api/scheduler/stats')
+def scheduler_stats():
+    cloner = _cloner if is_ready() else None
+    return jsonify({
+        'pending': scheduler.pending(),
+        'batches': scheduler.batches,
+        'jobs': scheduler.jobs,
+        'max_batch_size': scheduler.max_batch_size,
+        'max_wait_ms': scheduler.max_wait * 1000,
+        'worker_load': _worker_pool.load() if _worker_pool else None,
+        'speaker_cache': cloner.speaker_cache.stats() if cloner else None,
+        'output_cache': cloner.output_cache.stats() if cloner and cloner.output_cache else None,
+        'phrase_cache': cloner.phrase_cache.stats() if cloner and cloner.phrase_cache else None,
+    })
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
+@app.route('/health')
+def health():
+    """Readiness probe: 200 only once the model is loaded and warmed up."""
+    if is_ready():
+        return jsonify({'status': 'ready'})
+    if _load_error:
+        return jsonify({'status': 'failed', 'error': _load_error}), 500
+    start_background_load()
+    return jsonify({'status': 'starting'}), 503
+
+
+@app.route('/health/live')
+def liveness():
+    return jsonify({'status': 'alive'})
+
+
+@app.route('/')
+def index():
+    return jsonify({"status": "XTTS server is running"})
+
+
+start_background_load()
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=5002, threaded=True)
@@ -0,0 +1,159 @@
+import logging
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+import torch
+
+from file_utils import hash_file
+from output_cache import OutputCache
+
+logger = logging.getLogger(__name__)
+
+
+# Live caches, so a forked synthesis worker can replace locks another thread held at fork time
+_instances = weakref.WeakSet()
+
+
+def _reset_locks_after_fork():
+    for cache in list(_instances):
+        cache._lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_locks_after_fork)
+
+
+def _tensor_bytes(*tensors):
+    return sum(t.element_size() * t.nelement() for t in tensors)
+
+
+class SpeakerCache:
+    """
+    Two-level cache of XTTS speaker conditioning keyed by reference audio hash.
+
+    Entries live in an in-memory LRU bounded by entry count and tensor bytes,
+    backed by an on-disk store of ``{key}.pt`` files holding the GPT
+    conditioning latents and the speaker embedding. The disk store is an
+    ``OutputCache`` with its own count and size bounds, so files left by old
+    references or an older namespace age out.
+    """
+
+    def __init__(self, cache_dir="speaker_cache", max_entries=64, max_bytes=256 * 1024 * 1024,
+                 device="cpu", namespace="", max_disk_entries=4096, max_disk_bytes=1024 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.device = device
+        self.namespace = namespace
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        _instances.add(self)
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._disk = None
+        if self.cache_dir:
+            self._disk = OutputCache(self.cache_dir, max_bytes=max_disk_bytes, max_entries=max_disk_entries)
+
+    def key_for(self, speaker_wav):
+        return hash_file(speaker_wav, self.namespace)
+
+    def _remember(self, key, latents):
+        # Caller holds the lock
+        if key in self._entries:
+            self._bytes -= _tensor_bytes(*self._entries.pop(key))
+        self._entries[key] = latents
+        self._bytes += _tensor_bytes(*latents)
+
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            evicted_key, evicted = self._entries.popitem(last=False)
+            self._bytes -= _tensor_bytes(*evicted)
+            self.evictions += 1
+            logger.debug(f"Evicted speaker latents {evicted_key[:12]} from memory")
+
+    def get(self, key):
+        with self._lock:
+            latents = self._entries.get(key)
+            if latents is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return latents
+
+        # Also finds entries written by other processes sharing the directory
+        path = self._disk.get(key, "pt") if self._disk else None
+        if path:
+            try:
+                stored = torch.load(path, map_location=self.device)
+                latents = (stored["gpt_cond_latent"], stored["speaker_embedding"])
+            except Exception as e:
+                logger.warning(f"Discarding unreadable speaker cache entry {key[:12]}: {str(e)}")
+                os.remove(path)
+            else:
+                with self._lock:
+                    self._remember(key, latents)
+                    self.hits += 1
+                    self.disk_hits += 1
+                return latents
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, gpt_cond_latent, speaker_embedding):
+        latents = (gpt_cond_latent, speaker_embedding)
+        with self._lock:
+            self._remember(key, latents)
+
+        if self._disk:
+            path = self._disk.path_for(key, "pt")
+            # Write to a temp name first so a crash never leaves a truncated entry behind
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+            torch.save({
+                "gpt_cond_latent": gpt_cond_latent.detach().cpu(),
+                "speaker_embedding": speaker_embedding.detach().cpu(),
+            }, tmp_path)
+            os.replace(tmp_path, path)
+            self._disk.add(key, path)
+        return latents
+
+    def get_or_compute(self, speaker_wav, compute, key=None):
+        """
+        Returns cached conditioning for ``speaker_wav``, computing it on a miss.
+
+        Args:
+            speaker_wav (str): Path to the reference audio.
+            compute (callable): Called with ``speaker_wav`` on a miss; must return
+                ``(gpt_cond_latent, speaker_embedding)``.
+            key (str): Precomputed ``key_for(speaker_wav)``, to avoid rehashing.
+
+        Returns:
+            tuple: ``(gpt_cond_latent, speaker_embedding)`` on ``self.device``.
+        """
+        key = key or self.key_for(speaker_wav)
+        latents = self.get(key)
+        if latents is not None:
+            return latents
+
+        logger.info(f"Computing speaker conditioning for {os.path.basename(speaker_wav)}")
+        gpt_cond_latent, speaker_embedding = compute(speaker_wav)
+        return self.put(key, gpt_cond_latent, speaker_embedding)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "disk": self._disk.stats() if self._disk else None,
+            }
@@ -0,0 +1,73 @@
+"""
+Offline stand-in for the Play.ht API, for local development and load tests.
+
+Enable it by starting test.py with ``TTS_BACKEND=stub``. Latencies are
+configurable so queueing behaviour can be exercised realistically.
+"""
+import hashlib
+import io
+import math
+import os
+import struct
+import time
+import wave
+
+import numpy as np
+
+import encoder
+from playht_client import tee_to_file
+
+STUB_CLONE_LATENCY = float(os.getenv('STUB_CLONE_LATENCY', '0.5'))
+STUB_TTS_LATENCY = float(os.getenv('STUB_TTS_LATENCY', '1.0'))
+STUB_SAMPLE_RATE = 24000
+
+
+def _tone(text, seconds_per_char=0.06):
+    # A quiet tone whose length follows the text, so outputs differ per request
+    num_samples = max(1, int(len(text) * seconds_per_char * STUB_SAMPLE_RATE))
+    frames = bytearray()
+    for i in range(num_samples):
+        frames += struct.pack("<h", int(3000 * math.sin(2 * math.pi * 220 * i / STUB_SAMPLE_RATE)))
+    return bytes(frames)
+
+
+def clone_voice(sample_file_path, voice_name):
+    time.sleep(STUB_CLONE_LATENCY)
+    with open(sample_file_path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    return {"id": f"stub-{digest[:16]}", "name": voice_name}
+
+
+def _wav_bytes(text):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(STUB_SAMPLE_RATE)
+        f.writeframes(_tone(text))
+    return buffer.getvalue()
+
+
+def _encoded_bytes(text, output_format):
+    if output_format in (None, 'wav'):
+        return _wav_bytes(text)
+    if output_format not in encoder.SUPPORTED_FORMATS:
+        raise ValueError(f"Stub backend cannot produce {output_format}; supported: {encoder.SUPPORTED_FORMATS}")
+    audio = np.frombuffer(_tone(text), dtype="<i2").astype(np.float32) / 32768.0
+    return encoder.encode(audio, STUB_SAMPLE_RATE, output_format)
+
+
+def stream_tts(voice_id, text_to_speak, output_format, payload_options=None, chunk_size=16 * 1024):
+    # Encodes to the requested format, like the real API, so content types stay truthful
+    time.sleep(STUB_TTS_LATENCY)
+    data = _encoded_bytes(text_to_speak, output_format)
+    for start in range(0, len(data), chunk_size):
+        yield data[start:start + chunk_size]
+
+
+def generate_tts(voice_id, text_to_speak, output_file, payload_options=None):
+    # Written through a .part file like the real backend, so a failed encode never leaves a partial output
+    output_format = encoder.format_for(output_file) or None
+    for _ in tee_to_file(stream_tts(voice_id, text_to_speak, output_format, payload_options), output_file):
+        pass
+    return output_file
@@ -1,12 +1,24 @@
 import os
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file, send_from_directory, stream_with_context
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
-import requests
-from pyht import Client
-from pyht.client import TTSOptions
 import uuid
+import mimetypes
 from dotenv import load_dotenv
+from jobs import JobManager
+from scheduler import QueueFullError
+from file_utils import hash_file
+from uploads import UPLOAD_MAX_BYTES, UploadError, save_upload
+from janitor import Janitor
+from voice_registry import VoiceRegistry
+from output_cache import OutputCache, cache_key
+from playht_client import STREAM_CHUNK_SIZE, TIMEOUT, get_session, tee_to_file
+from llm import GENERATOR_BACKEND, ScriptGenerator, create_backend
+from pipeline import speak_stream
+import metrics
+from wav_utils import wav_pcm, wav_stream_header
+import threading
 
 # Load environment variables
 load_dotenv()
@@ -14,16 +26,54 @@ load_dotenv()
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
+# Reject oversized bodies before they are read; the form fields need a little headroom
+app.config['MAX_CONTENT_LENGTH'] = UPLOAD_MAX_BYTES + 1024 * 1024
+
 # Configure upload folder
 UPLOAD_FOLDER = 'uploads'
 OUTPUT_FOLDER = 'output'
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 
+# Generated audio is immutable (unique or content-addressed names), so clients may cache it for good
+AUDIO_MAX_AGE = 365 * 24 * 3600
+
+# Retention for uploads/ and output/; the output cache subdirectory keeps its own size budget
+RETENTION_HOURS = float(os.getenv('RETENTION_HOURS', '24'))
+UPLOADS_QUOTA_BYTES = int(os.getenv('UPLOADS_QUOTA_MB', '1024')) * 1024 * 1024
+OUTPUT_QUOTA_BYTES = int(os.getenv('OUTPUT_QUOTA_MB', '2048')) * 1024 * 1024
+janitor = Janitor(interval=float(os.getenv('JANITOR_INTERVAL', '300')))
+janitor.add(UPLOAD_FOLDER, max_age=RETENTION_HOURS * 3600, max_bytes=UPLOADS_QUOTA_BYTES)
+janitor.add(OUTPUT_FOLDER, max_age=RETENTION_HOURS * 3600, max_bytes=OUTPUT_QUOTA_BYTES)
+janitor.start()
+
 # API credentials
 USER_ID = ""
 API_KEY = ""
 
+# "playht" talks to the real API, "stub" uses the offline stand-in in stub_backend.py
+TTS_BACKEND = os.getenv('TTS_BACKEND', 'playht')
+
+# Background job pool for the async API
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '4'))
+JOB_MAX_PENDING = int(os.getenv('JOB_MAX_PENDING', '32'))
+job_manager = JobManager(max_workers=JOB_WORKERS, max_pending=JOB_MAX_PENDING)
+
+# Content-addressed cache of rendered audio, served from OUTPUT_FOLDER/cache
+OUTPUT_CACHE_FOLDER = os.path.join(OUTPUT_FOLDER, 'cache')
+OUTPUT_CACHE_MAX_BYTES = int(os.getenv('OUTPUT_CACHE_MAX_MB', '1024')) * 1024 * 1024
+output_cache = OutputCache(OUTPUT_CACHE_FOLDER, max_bytes=OUTPUT_CACHE_MAX_BYTES)
+
+# Script generation for the pipelined endpoint; GENERATOR_BACKEND=fake runs it offline
+GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+PIPELINE_LOOKAHEAD = int(os.getenv('PIPELINE_LOOKAHEAD', '2'))
+PIPELINE_SAMPLE_RATE = 24000
+_script_generator = None
+_script_generator_lock = threading.Lock()
+
+# Sample hash -> cloned voice id, kept per backend since ids are not portable
+voice_registry = VoiceRegistry(os.getenv('VOICE_REGISTRY_PATH', f"voices_{TTS_BACKEND}.json"))
+
 # Step 1: Clone a voice from an audio sample
 def clone_voice(sample_file_path, voice_name):
     url = "https://api.play.ht/api/v2/cloned-voices/instant"
@@ -41,7 +91,7 @@ def clone_voice(sample_file_path, voice_name):
             "X-USER-ID": USER_ID
         }
         
-        response = requests.post(url, files=files, data=payload, headers=headers)
+        response = get_session().post(url, files=files, data=payload, headers=headers, timeout=TIMEOUT)
         return response.json()
 
 # Step 2: Generate TTS using the cloned voice
@@ -62,12 +112,10 @@ def clone_voice(sample_file_path, voice_name):
 #     return output_file
 
 
-def generate_tts(voice_id, text_to_speak, output_file, payload_options=None):
+def stream_tts(voice_id, text_to_speak, output_format, payload_options=None):
+    """Yields audio bytes from the Play.ht stream endpoint as they arrive."""
     url = "https://api.play.ht/api/v2/tts/stream"
     
-    # Extract the output format from the output_file path
-    output_format = output_file.split('.')[-1]
-    
     # Base payload with required parameters
     payload = {
         "voice": voice_id,
@@ -86,28 +134,75 @@ def generate_tts(voice_id, text_to_speak, output_file, payload_options=None):
         "X-USER-ID": USER_ID
     }
     
-    response = requests.post(url, json=payload, headers=headers)
+    response = get_session().post(url, json=payload, headers=headers, timeout=TIMEOUT, stream=True)
     
     # Check if response is successful
-    if response.status_code == 200:
-        # Ensure output file has correct extension
-        if "output_format" in payload and not output_file.endswith(f".{payload['output_format']}"):
-            output_file = f"{os.path.splitext(output_file)[0]}.{payload['output_format']}"
-            
-        with open(output_file, "wb") as f:
-            f.write(response.content)
-        return output_file
-    else:
+    if response.status_code != 200:
         raise Exception(f"Error generating TTS: {response.status_code} - {response.text}")
 
-@app.route('/api/clone-and-generate', methods=['POST'])
-def clone_and_generate():
+    with response:
+        for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+            if chunk:
+                yield chunk
+
+
+def resolve_output_path(output_file, payload_options=None):
+    # Ensure output file has correct extension when the frontend overrides the format
+    output_format = output_file.split('.')[-1]
+    if payload_options and isinstance(payload_options, dict):
+        output_format = payload_options.get("output_format", output_format)
+    if not output_file.endswith(f".{output_format}"):
+        output_file = f"{os.path.splitext(output_file)[0]}.{output_format}"
+    return output_file, output_format
+
+
+def generate_tts(voice_id, text_to_speak, output_file, payload_options=None):
+    output_file, output_format = resolve_output_path(output_file, payload_options)
+
+    # Stream straight to disk so memory stays flat regardless of clip length
+    chunks = stream_tts(voice_id, text_to_speak, output_format, payload_options)
+    for _ in tee_to_file(chunks, output_file):
+        pass
+    return output_file
+
+
+class CloneError(Exception):
+    def __init__(self, details):
+        super().__init__('Failed to clone voice')
+        self.details = details
+
+
+if TTS_BACKEND == 'stub':
+    from stub_backend import clone_voice, generate_tts, stream_tts  # noqa: F811
+
+
+def get_script_generator():
+    # Created on first use so the TTS-only endpoints never need the LLM client
+    global _script_generator
+    if _script_generator is None:
+        with _script_generator_lock:
+            if _script_generator is None:
+                _script_generator = ScriptGenerator(create_backend(GENERATOR_BACKEND, api_key=GEMINI_API_KEY))
+    return _script_generator
+
+
+def parse_clone_request(text_field='message'):
+    """
+    Validates a clone-and-generate form and saves the uploaded sample.
+
+    ``text_field`` names the form field holding the text; its value is
+    returned under ``message`` either way.
+
+    Returns:
+        tuple: (kwargs for run_clone_and_generate, None) on success, or
+        (None, error response) when the request is invalid.
+    """
     if 'sample_file' not in request.files:
-        return jsonify({'error': 'No sample_file part'}), 400
+        return None, (jsonify({'error': 'No sample_file part'}), 400)
     
     sample_file = request.files['sample_file']
     voice_name = request.form.get('voice_name', 'Voice Clone')
-    message = request.form.get('message', '')
+    message = request.form.get(text_field, '')
     
     # Default output format (can be overridden by frontend payload)
     output_format = request.form.get('output_format', 'mp3')
@@ -116,56 +211,275 @@ def clone_and_generate():
     # These could include: emotion, language, etc.
     tts_options = {}
     for key in request.form:
-        if key not in ['voice_name', 'message', 'output_format'] and key != 'sample_file':
+        if key not in ['voice_name', text_field, 'output_format'] and key != 'sample_file':
             tts_options[key] = request.form.get(key)
     
     if not message:
-        return jsonify({'error': 'No message provided'}), 400
+        return None, (jsonify({'error': f"No {text_field} provided"}), 400)
     
     # Create unique filename for the uploaded sample
     unique_id = str(uuid.uuid4())
-    sample_filename = secure_filename(f"{unique_id}_{sample_file.filename}")
-    sample_path = os.path.join(UPLOAD_FOLDER, sample_filename)
-    
-    # Save the uploaded sample
-    sample_file.save(sample_path)
+    sample_name = secure_filename(f"{unique_id}_{os.path.splitext(sample_file.filename or 'sample')[0]}")
     
+    # Stream the sample to disk, rejecting bad uploads before any clone work
     try:
-        # Clone the voice
-        clone_result = clone_voice(sample_path, voice_name)
-        
+        sample_path, sample_hash, _ = save_upload(sample_file, UPLOAD_FOLDER, sample_name)
+    except UploadError as e:
+        return None, (jsonify({'error': str(e)}), e.status)
+
+    return {
+        'unique_id': unique_id,
+        'sample_path': sample_path,
+        'sample_hash': sample_hash,
+        'voice_name': voice_name,
+        'message': message,
+        'output_format': output_format,
+        'tts_options': tts_options,
+    }, None
+
+
+def output_cache_key(voice_id, message, output_format, tts_options):
+    return cache_key({
+        'backend': TTS_BACKEND,
+        'voice_id': voice_id,
+        'text': message,
+        'format': output_format,
+        'options': tts_options,
+    })
+
+
+def audio_url_for(path):
+    return f"/api/audio/{os.path.relpath(path, OUTPUT_FOLDER).replace(os.sep, '/')}"
+
+
+def run_generate(unique_id, voice_id, message, output_format, tts_options):
+    output_path, output_format = resolve_output_path(
+        os.path.join(OUTPUT_FOLDER, f"{unique_id}_output.{output_format}"), tts_options
+    )
+
+    # Identical requests are served from the output cache without calling the upstream
+    key = output_cache_key(voice_id, message, output_format, tts_options)
+    cached_path = output_cache.get(key, output_format)
+    metrics.record_cache('playht_output', bool(cached_path))
+    if cached_path:
+        output_path = cached_path
+    else:
+        # Generate TTS with the cloned voice, passing tts_options through
+        with metrics.span('clone_and_generate', 'tts'):
+            output_path = generate_tts(voice_id, message, output_path, tts_options)
+        output_path = output_cache.put(key, output_path)
+    
+    # Return the URL to the generated audio
+    audio_url = audio_url_for(output_path)
+    print(f"'voice_id': {voice_id}, \n'audio_url': {audio_url}, \n'format': {output_format}, \n'applied_options': {tts_options}, \n'cached': {bool(cached_path)}")
+
+    return {
+        'voice_id': voice_id, 
+        'audio_url': audio_url,
+        'format': output_format,
+        'applied_options': tts_options,
+        'cached': bool(cached_path)
+    }
+
+
+def resolve_voice(sample_path, voice_name, sample_hash=None):
+    """Returns ``(voice_id, reused)``, cloning only samples not seen before."""
+    def clone():
+        with metrics.span('clone_and_generate', 'clone'):
+            clone_result = clone_voice(sample_path, voice_name)
         if 'id' not in clone_result:
-            return jsonify({'error': 'Failed to clone voice', 'details': clone_result}), 500
-        
-        voice_id = clone_result['id']
+            raise CloneError(clone_result)
+        return clone_result
+
+    # Reuse the voice already cloned from identical sample bytes, if any
+    sample_hash = sample_hash or hash_file(sample_path)
+    voice_id, reused = voice_registry.get_or_clone(sample_hash, voice_name, clone)
+    metrics.record_cache('voice_registry', reused)
+
+    if reused:
+        print(f"Reusing cloned voice ID: {voice_id}")
+        # The upstream already has this sample, so the duplicate upload is not needed
+        os.remove(sample_path)
+    else:
         print(f"Voice cloned with ID: {voice_id}")
+    return voice_id, reused
+
+
+def run_clone_and_generate(unique_id, sample_path, sample_hash, voice_name, message, output_format, tts_options):
+    voice_id, reused = resolve_voice(sample_path, voice_name, sample_hash)
+    result = run_generate(unique_id, voice_id, message, output_format, tts_options)
+    result['reused_voice'] = reused
+    return result
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    return jsonify({'error': f"Upload exceeds {UPLOAD_MAX_BYTES // (1024 * 1024)} MB"}), 413
+
+
+@app.route('/api/clone-and-generate', methods=['POST'])
+def clone_and_generate():
+    with metrics.span('clone_and_generate', 'upload'):
+        params, error = parse_clone_request()
+    if error:
+        metrics.record_error('clone_and_generate', 'upload')
+        return error
+    
+    try:
+        with metrics.span('clone_and_generate', 'total'):
+            result = run_clone_and_generate(**params)
+        return jsonify({'success': True, **result})
         
-        # Generate TTS with the cloned voice
-        output_filename = f"{unique_id}_output.{output_format}"
-        output_path = os.path.join(OUTPUT_FOLDER, output_filename)
-        
-        # Pass tts_options to generate_tts
-        output_path = generate_tts(voice_id, message, output_path, tts_options)
-        
-        # Extract the actual filename in case it was modified
-        actual_filename = os.path.basename(output_path)
-        
-        # Return the URL to the generated audio
-        audio_url = f"/api/audio/{actual_filename}"
-        print(f"'voice_id': {voice_id}, \n'audio_url': {audio_url}, \n'format': {output_format}, \n'applied_options': {tts_options}")
-
-
-        return jsonify({
-            'success': True, 
-            'voice_id': voice_id, 
-            'audio_url': audio_url,
-            'format': output_format,
-            'applied_options': tts_options
-        })
-        
+    except CloneError as e:
+        return jsonify({'error': str(e), 'details': e.details}), 500
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    """Queues a clone-and-generate job and returns its id without waiting for it."""
+    params, error = parse_clone_request()
+    if error:
+        return error
+
+    try:
+        job_id = job_manager.submit(run_clone_and_generate, **params)
+    except QueueFullError:
+        os.remove(params['sample_path'])
+        response = jsonify({'error': 'Too many pending jobs, try again later'})
+        response.headers['Retry-After'] = '5'
+        return response, 429
+
+    return jsonify({'job_id': job_id, 'status': 'queued', 'status_url': f"/api/jobs/{job_id}"}), 202
+
+
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+
+    response = {'job_id': job_id, 'status': job['status']}
+    if job['status'] == 'done':
+        response.update(job['result'])
+    elif job['status'] == 'failed':
+        response['error'] = job['error']
+    return jsonify(response)
+
+
+@app.route('/api/jobs/stats')
+def job_stats():
+    return jsonify(job_manager.stats())
+
+
+@app.route('/api/voices')
+def list_voices():
+    return jsonify({'voices': voice_registry.voices()})
+
+
+@app.route('/api/voices/<voice_id>/generate', methods=['POST'])
+def generate_with_voice(voice_id):
+    """Synthesizes with an already cloned voice, without uploading a sample."""
+    if not voice_registry.has_voice(voice_id):
+        return jsonify({'error': f"Unknown voice id: {voice_id}"}), 404
+
+    data = request.get_json(silent=True) or request.form.to_dict()
+    message = data.get('message', '')
+    output_format = data.get('output_format', 'mp3')
+
+    if not message:
+        return jsonify({'error': 'No message provided'}), 400
+
+    tts_options = {key: value for key, value in data.items() if key not in ['message', 'output_format']}
+
+    try:
+        result = run_generate(str(uuid.uuid4()), voice_id, message, output_format, tts_options)
+        return jsonify({'success': True, **result})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def stream_audio_response(unique_id, voice_id, message, output_format, tts_options):
+    """
+    Relays the upstream TTS stream to the client while saving it to the output cache.
+
+    The saved file's URL is returned in the ``X-Audio-Url`` header so the
+    frontend can replay or download it later without regenerating.
+    """
+    _, output_format = resolve_output_path(f"{unique_id}_output.{output_format}", tts_options)
+    key = output_cache_key(voice_id, message, output_format, tts_options)
+    cache_path = output_cache.path_for(key, output_format)
+    mimetype = mimetypes.guess_type(cache_path)[0] or 'application/octet-stream'
+    headers = {
+        'X-Voice-Id': voice_id,
+        'X-Audio-Url': audio_url_for(cache_path),
+    }
+
+    cached_path = output_cache.get(key, output_format)
+    if cached_path:
+        response = send_file(cached_path, mimetype=mimetype, conditional=True)
+        response.headers.update({**headers, 'X-Cache': 'HIT'})
+        return response
+
+    # Start the upstream request now so errors surface as a JSON response, not a broken stream
+    chunks = stream_tts(voice_id, message, output_format, tts_options)
+    try:
+        first_chunk = next(chunks)
+    except StopIteration:
+        first_chunk = b''
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    def relay():
+        yield first_chunk
+        yield from chunks
+
+    def relay_and_cache():
+        yield from tee_to_file(relay(), cache_path)
+        output_cache.add(key, cache_path)
+
+    return Response(
+        stream_with_context(relay_and_cache()),
+        mimetype=mimetype,
+        headers={**headers, 'X-Cache': 'MISS', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.route('/api/voices/<voice_id>/stream', methods=['POST'])
+def stream_with_voice(voice_id):
+    if not voice_registry.has_voice(voice_id):
+        return jsonify({'error': f"Unknown voice id: {voice_id}"}), 404
+
+    data = request.get_json(silent=True) or request.form.to_dict()
+    message = data.get('message', '')
+    output_format = data.get('output_format', 'mp3')
+
+    if not message:
+        return jsonify({'error': 'No message provided'}), 400
+
+    tts_options = {key: value for key, value in data.items() if key not in ['message', 'output_format']}
+    return stream_audio_response(str(uuid.uuid4()), voice_id, message, output_format, tts_options)
+
+
+@app.route('/api/clone-and-stream', methods=['POST'])
+def clone_and_stream():
+    """Like clone-and-generate, but streams the audio back as it is synthesized."""
+    params, error = parse_clone_request()
+    if error:
+        return error
+
+    try:
+        voice_id, _ = resolve_voice(params['sample_path'], params['voice_name'], params['sample_hash'])
+    except CloneError as e:
+        return jsonify({'error': str(e), 'details': e.details}), 500
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    return stream_audio_response(
+        params['unique_id'], voice_id, params['message'], params['output_format'], params['tts_options']
+    )
+
 # @app.route('/api/clone-and-generate', methods=['POST'])
 # def clone_and_generate():
 #     if 'sample_file' not in request.files:
@@ -208,9 +522,78 @@ def clone_and_generate():
 #     except Exception as e:
 #         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/audio/<filename>')
+@app.route('/api/generate-and-speak', methods=['POST'])
+def generate_and_speak():
+    """
+    Generates a script from ``prompt`` and streams it back as speech in one request.
+
+    Each sentence goes to TTS as soon as the model finishes it, so audio
+    starts before the script is complete. Supports ``mp3`` (sentence streams
+    are frame-concatenated) and ``wav`` (joined behind one streaming header).
+    """
+    params, error = parse_clone_request(text_field='prompt')
+    if error:
+        return error
+
+    output_format = params['output_format']
+    tts_options = params['tts_options']
+    if output_format not in ('mp3', 'wav'):
+        os.remove(params['sample_path'])
+        return jsonify({'error': 'output_format must be mp3 or wav for streaming'}), 400
+
+    try:
+        voice_id, _ = resolve_voice(params['sample_path'], params['voice_name'], params['sample_hash'])
+    except CloneError as e:
+        return jsonify({'error': str(e), 'details': e.details}), 500
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    sample_rate = int(tts_options.get('sample_rate', PIPELINE_SAMPLE_RATE))
+
+    def synthesize(sentence):
+        chunks = stream_tts(voice_id, sentence, output_format, tts_options)
+        return wav_pcm(chunks, sample_rate) if output_format == 'wav' else chunks
+
+    def audio():
+        if output_format == 'wav':
+            yield wav_stream_header(sample_rate)
+        try:
+            yield from speak_stream(
+                get_script_generator().stream(params['message']), synthesize, lookahead=PIPELINE_LOOKAHEAD
+            )
+        except Exception as e:
+            # Headers are already sent, so all we can do is end the stream early
+            print(f"Pipeline failed: {str(e)}")
+
+    mimetype = 'audio/wav' if output_format == 'wav' else 'audio/mpeg'
+    return Response(
+        stream_with_context(audio()),
+        mimetype=mimetype,
+        headers={'X-Voice-Id': voice_id, 'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.route('/api/audio/<path:filename>')
 def get_audio(filename):
-    return send_file(os.path.join(OUTPUT_FOLDER, filename))
+    # Conditional responses give the player Range, ETag and Last-Modified support for seeking
+    response = send_from_directory(OUTPUT_FOLDER, filename, conditional=True, max_age=AUDIO_MAX_AGE)
+    response.headers['Cache-Control'] = f"public, max-age={AUDIO_MAX_AGE}, immutable"
+    return response
+
+
+@app.route('/api/cache/stats')
+def cache_stats():
+    return jsonify(output_cache.stats())
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
+@app.route('/api/janitor/stats')
+def janitor_stats():
+    return jsonify(janitor.stats())
 
 # Add a simple test route
 @app.route('/')
@@ -0,0 +1,111 @@
+import re
+import unicodedata
+
+# Sentence boundaries: Latin terminators followed by whitespace, Devanagari danda /
+# double danda (often written without a following space), or line breaks
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|(?<=[।॥])\s*|\n+")
+
+
+def split_sentences(text):
+    """
+    Splits text into sentences, keeping the terminating punctuation.
+
+    Args:
+        text (str): Input text; Hindi (``।``) and Latin punctuation are both handled.
+
+    Returns:
+        list[str]: Non-empty, stripped sentences in order.
+    """
+    return [sentence.strip() for sentence in _SENTENCE_BOUNDARY.split(text) if sentence.strip()]
+
+
+def normalize_sentence(sentence):
+    """
+    Canonical form of a sentence for cache lookups.
+
+    Applies Unicode NFC (Devanagari can be typed with different code point
+    sequences) and collapses whitespace. Case and punctuation are kept, since
+    both change how XTTS reads the sentence.
+    """
+    return " ".join(unicodedata.normalize("NFC", sentence).split())
+
+
+# Clause boundaries inside a sentence: commas, semicolons, colons and dashes
+_CLAUSE_BOUNDARY = re.compile(r"(?<=[,;:،])\s+|\s+[—–-]\s+")
+
+# XTTS starts to truncate or drift on inputs longer than roughly this many characters
+MAX_SEGMENT_CHARS = 250
+
+
+def _pack(pieces, max_chars, separator=" "):
+    # Greedily joins pieces in order while the result stays within max_chars
+    packed, current = [], ""
+    for piece in pieces:
+        candidate = f"{current}{separator}{piece}" if current else piece
+        if current and len(candidate) > max_chars:
+            packed.append(current)
+            current = piece
+        else:
+            current = candidate
+    if current:
+        packed.append(current)
+    return packed
+
+
+def split_segments(text, max_chars=MAX_SEGMENT_CHARS):
+    """
+    Splits long text into synthesis-sized segments.
+
+    Each sentence becomes a segment; sentences longer than ``max_chars`` are
+    broken at clause boundaries, and clauses that are still too long at word
+    boundaries. Order is preserved.
+
+    Args:
+        text (str): Input text; Devanagari danda and Latin punctuation are both handled.
+        max_chars (int): Target upper bound on segment length.
+
+    Returns:
+        list[str]: Non-empty segments in reading order.
+    """
+    segments = []
+    for sentence in split_sentences(text):
+        if len(sentence) <= max_chars:
+            segments.append(sentence)
+            continue
+
+        clauses = []
+        for clause in _CLAUSE_BOUNDARY.split(sentence):
+            clause = clause.strip()
+            if not clause:
+                continue
+            if len(clause) > max_chars:
+                clauses.extend(_pack(clause.split(), max_chars))
+            else:
+                clauses.append(clause)
+        segments.extend(_pack(clauses, max_chars))
+    return segments
+
+
+class SentenceBuffer:
+    """
+    Accumulates streamed text and releases sentences as soon as they are complete.
+
+    A Latin sentence counts as complete once whitespace follows its terminator
+    (so "3.14" is not split mid-token); a danda ends a sentence immediately.
+    """
+
+    def __init__(self):
+        self._pending = ""
+
+    def feed(self, text):
+        """Adds a chunk of text and returns the sentences it completed, in order."""
+        self._pending += text
+        parts = _SENTENCE_BOUNDARY.split(self._pending)
+        # The last part is still open: more text may follow before its boundary
+        self._pending = parts.pop()
+        return [part.strip() for part in parts if part.strip()]
+
+    def flush(self):
+        """Returns whatever text is left once the stream has ended."""
+        rest, self._pending = self._pending.strip(), ""
+        return [rest] if rest else []
@@ -0,0 +1,164 @@
+import hashlib
+import logging
+import os
+import subprocess
+
+import soundfile as sf
+
+logger = logging.getLogger(__name__)
+
+# Upload limits; references longer than UPLOAD_MAX_SECONDS are trimmed rather than rejected
+UPLOAD_MAX_BYTES = int(os.getenv('UPLOAD_MAX_MB', '20')) * 1024 * 1024
+UPLOAD_MAX_SECONDS = float(os.getenv('UPLOAD_MAX_SECONDS', '30'))
+UPLOAD_MIN_SECONDS = float(os.getenv('UPLOAD_MIN_SECONDS', '1'))
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Containers soundfile can probe and cut without ffmpeg; m4a/webm still need ffprobe/ffmpeg
+_SOUNDFILE_FORMATS = {'wav', 'flac', 'ogg', 'mp3'}
+
+
+class UploadError(Exception):
+    """Raised for an upload that is rejected before any clone work; carries the HTTP status."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def sniff_format(header):
+    """
+    Identifies an audio container from its first bytes.
+
+    Args:
+        header (bytes): At least the first 12 bytes of the file.
+
+    Returns:
+        str | None: File extension for the detected format, or None if unknown.
+    """
+    if header[:4] == b'RIFF' and header[8:12] == b'WAVE':
+        return 'wav'
+    if header[:4] == b'fLaC':
+        return 'flac'
+    if header[:4] == b'OggS':
+        return 'ogg'
+    if header[4:8] == b'ftyp':
+        return 'm4a'
+    if header[:4] == b'\x1aE\xdf\xa3':
+        return 'webm'
+    # MP3: ID3 tag or a bare MPEG audio frame sync (a zero layer field would be ADTS AAC)
+    if header[:3] == b'ID3' or (len(header) > 1 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0
+                                and header[1] & 0x06):
+        return 'mp3'
+    return None
+
+
+def probe_duration(path, fmt):
+    """
+    Reads the duration from the container headers without decoding the audio.
+
+    Returns:
+        float | None: Duration in seconds, or None if it could not be determined.
+    """
+    if fmt in _SOUNDFILE_FORMATS:
+        try:
+            return sf.info(path).duration
+        except RuntimeError:
+            pass
+
+    try:
+        result = subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'default=nw=1:nk=1', path],
+            capture_output=True, text=True, timeout=10, check=True
+        )
+        return float(result.stdout.strip())
+    except (OSError, subprocess.SubprocessError, ValueError):
+        return None
+
+
+def trim_to_duration(path, fmt, max_seconds):
+    """Cuts a file down to its first ``max_seconds`` in place."""
+    tmp_path = f"{os.path.splitext(path)[0]}.trim.{fmt}"
+    if fmt in _SOUNDFILE_FORMATS:
+        info = sf.info(path)
+        audio, sr = sf.read(path, frames=int(max_seconds * info.samplerate), dtype='float32')
+        sf.write(tmp_path, audio, sr, format=info.format, subtype=info.subtype)
+    else:
+        # Stream copy: cut at a packet boundary without re-encoding
+        subprocess.run(
+            ['ffmpeg', '-v', 'error', '-y', '-i', path, '-t', str(max_seconds), '-c', 'copy', tmp_path],
+            capture_output=True, timeout=60, check=True
+        )
+    os.replace(tmp_path, path)
+
+
+def save_upload(file_storage, upload_dir, name, max_bytes=UPLOAD_MAX_BYTES, max_seconds=UPLOAD_MAX_SECONDS,
+                min_seconds=UPLOAD_MIN_SECONDS):
+    """
+    Streams an uploaded sample to disk and validates it before any clone work.
+
+    The body is copied in chunks, hashed as it goes and aborted once it
+    exceeds ``max_bytes``. The container is sniffed from the first bytes and
+    the duration probed from its headers; samples longer than ``max_seconds``
+    are trimmed.
+
+    Args:
+        file_storage: Werkzeug ``FileStorage`` from ``request.files``.
+        upload_dir (str): Directory to save into.
+        name (str): Sanitized file stem; the extension comes from the sniffed format.
+        max_bytes (int): Upload size limit.
+        max_seconds (float): Trim target; 0 disables trimming.
+        min_seconds (float): Shortest accepted sample.
+
+    Returns:
+        tuple: ``(path, sha256, duration)``. The hash covers the uploaded bytes,
+        so identical uploads dedupe whether or not they were trimmed.
+
+    Raises:
+        UploadError: With status 413 (too large), 415 (not audio) or 400 (unreadable or too short).
+    """
+    part_path = os.path.join(upload_dir, f"{name}.part")
+    digest = hashlib.sha256()
+    size = 0
+    header = b''
+
+    try:
+        with open(part_path, 'wb') as f:
+            for chunk in iter(lambda: file_storage.stream.read(UPLOAD_CHUNK_SIZE), b''):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadError(f"Sample exceeds {max_bytes // (1024 * 1024)} MB", status=413)
+                if len(header) < 12:
+                    header += chunk[:12 - len(header)]
+                digest.update(chunk)
+                f.write(chunk)
+
+        fmt = sniff_format(header)
+        if fmt is None:
+            raise UploadError('Sample is not a supported audio file (wav, mp3, ogg, flac, m4a, webm)', status=415)
+
+        path = os.path.join(upload_dir, f"{name}.{fmt}")
+        os.replace(part_path, path)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+
+    try:
+        duration = probe_duration(path, fmt)
+        if duration is None:
+            raise UploadError('Could not read the sample audio')
+        if duration < min_seconds:
+            raise UploadError(f"Sample is too short ({duration:.1f}s, need at least {min_seconds:g}s)")
+
+        if max_seconds and duration > max_seconds:
+            logger.info(f"Trimming {path} from {duration:.1f}s to {max_seconds:g}s")
+            trim_to_duration(path, fmt, max_seconds)
+            duration = max_seconds
+    except (UploadError, RuntimeError, OSError, subprocess.SubprocessError) as e:
+        os.remove(path)
+        if isinstance(e, UploadError):
+            raise
+        raise UploadError(f"Could not process the sample audio: {str(e)}") from e
+
+    return path, digest.hexdigest(), duration
@@ -0,0 +1,85 @@
+import logging
+import os
+import threading
+
+import librosa
+import numpy as np
+import torch
+from silero_vad import get_speech_timestamps, load_silero_vad
+
+logger = logging.getLogger(__name__)
+
+# Silero VAD is trained on 16 kHz input
+VAD_SAMPLE_RATE = 16000
+
+# Optional path to a pinned TorchScript checkpoint; defaults to the one bundled with silero-vad
+SILERO_VAD_PATH = os.getenv("SILERO_VAD_PATH")
+
+_model = None
+_load_lock = threading.Lock()
+# The Silero model keeps recurrent state between calls, so inference is serialized
+_inference_lock = threading.Lock()
+
+
+def _reset_locks_after_fork():
+    # Synthesis workers fork from a threaded parent; locks held at that moment would never be released
+    global _load_lock, _inference_lock
+    _load_lock = threading.Lock()
+    _inference_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_locks_after_fork)
+
+
+def _load_model():
+    if SILERO_VAD_PATH:
+        logger.info(f"Loading Silero VAD from {SILERO_VAD_PATH}")
+        model = torch.jit.load(SILERO_VAD_PATH, map_location="cpu")
+    else:
+        logger.info("Loading bundled Silero VAD checkpoint")
+        model = load_silero_vad()
+    model.eval()
+    return model
+
+
+def get_vad_model():
+    """
+    Returns the process-wide Silero VAD model, loading it on first use.
+
+    The model is loaded from a local checkpoint, so this never touches the
+    network or the torch hub cache.
+    """
+    global _model
+    if _model is None:
+        with _load_lock:
+            if _model is None:
+                _model = _load_model()
+    return _model
+
+
+def speech_timestamps(audio, sr):
+    """
+    Detects speech regions in a mono waveform.
+
+    Args:
+        audio (np.ndarray): Float waveform at ``sr``.
+        sr (int): Sample rate of ``audio``.
+
+    Returns:
+        list[tuple[int, int]]: ``(start, end)`` sample indices at ``sr``.
+    """
+    if sr != VAD_SAMPLE_RATE:
+        audio_16k = librosa.resample(audio, orig_sr=sr, target_sr=VAD_SAMPLE_RATE)
+    else:
+        audio_16k = audio
+
+    model = get_vad_model()
+    with _inference_lock, torch.inference_mode():
+        timestamps = get_speech_timestamps(
+            torch.from_numpy(np.ascontiguousarray(audio_16k, dtype=np.float32)),
+            model,
+            sampling_rate=VAD_SAMPLE_RATE
+        )
+
+    scale = sr / VAD_SAMPLE_RATE
+    return [(int(t["start"] * scale), min(int(t["end"] * scale), len(audio))) for t in timestamps]
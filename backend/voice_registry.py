@@ -0,0 +1,85 @@
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class VoiceRegistry:
+    """
+    Persistent map from voice sample content hash to an upstream cloned voice id.
+
+    Backed by a JSON file so repeat uploads of the same sample reuse the
+    existing clone across restarts instead of calling the clone API again.
+    """
+
+    def __init__(self, path="voices.json"):
+        self.path = path
+        self._voices = {}
+        self._lock = threading.Lock()
+        # One lock per sample hash so concurrent uploads of a new sample clone it only once
+        self._clone_locks = {}
+
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._voices = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable voice registry {self.path}: {e}")
+
+    def get(self, sample_hash):
+        with self._lock:
+            entry = self._voices.get(sample_hash)
+            return dict(entry) if entry else None
+
+    def has_voice(self, voice_id):
+        with self._lock:
+            return any(entry["voice_id"] == voice_id for entry in self._voices.values())
+
+    def voices(self):
+        with self._lock:
+            return [{"sample_hash": sample_hash, **entry} for sample_hash, entry in self._voices.items()]
+
+    def register(self, sample_hash, voice_id, voice_name):
+        with self._lock:
+            self._voices[sample_hash] = {
+                "voice_id": voice_id,
+                "voice_name": voice_name,
+                "created_at": time.time(),
+            }
+            self._save()
+
+    def get_or_clone(self, sample_hash, voice_name, clone):
+        """
+        Returns the voice id registered for ``sample_hash``, cloning on a miss.
+
+        Args:
+            sample_hash (str): Content hash of the voice sample.
+            voice_name (str): Name to register a newly cloned voice under.
+            clone (callable): Called with no arguments on a miss; must return
+                the upstream clone response containing an ``id``.
+
+        Returns:
+            tuple: ``(voice_id, reused)`` where ``reused`` is True on a registry hit.
+        """
+        with self._lock:
+            clone_lock = self._clone_locks.setdefault(sample_hash, threading.Lock())
+
+        with clone_lock:
+            entry = self.get(sample_hash)
+            if entry:
+                return entry["voice_id"], True
+
+            clone_result = clone()
+            voice_id = clone_result["id"]
+            self.register(sample_hash, voice_id, voice_name)
+            return voice_id, False
+
+    def _save(self):
+        # Caller holds the lock
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._voices, f, indent=2)
+        os.replace(tmp_path, self.path)
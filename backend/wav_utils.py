@@ -0,0 +1,57 @@
+import struct
+
+
+def wav_stream_header(sample_rate, channels=1, bits_per_sample=16):
+    # Length fields are maxed out since the total size is unknown while streaming
+    byte_rate = sample_rate * channels * bits_per_sample // 8
+    block_align = channels * bits_per_sample // 8
+    return (
+        b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, sample_rate, byte_rate, block_align, bits_per_sample)
+        + b"data" + struct.pack("<I", 0xFFFFFFFF - 36)
+    )
+
+
+def wav_pcm(chunks, sample_rate=None):
+    """
+    Strips the RIFF header from a streamed WAV and yields only its PCM data.
+
+    Reads just enough of the stream to find the ``data`` chunk, so several WAV
+    streams can be joined behind one ``wav_stream_header``.
+
+    Args:
+        chunks (iterable[bytes]): The WAV file as it arrives.
+        sample_rate (int): Expected sample rate; a mismatch raises ValueError.
+    """
+    chunks = iter(chunks)
+    buffer = b""
+    offset = 12
+    while True:
+        # Walk the RIFF chunks until the data chunk header is buffered
+        while len(buffer) < offset + 8:
+            chunk = next(chunks, None)
+            if chunk is None:
+                raise ValueError("WAV stream ended before its data chunk")
+            buffer += chunk
+        if offset == 12 and buffer[:4] != b"RIFF":
+            raise ValueError("Not a WAV stream")
+
+        chunk_id = buffer[offset:offset + 4]
+        chunk_size = struct.unpack("<I", buffer[offset + 4:offset + 8])[0]
+        if chunk_id == b"data":
+            break
+        if chunk_id == b"fmt " and sample_rate is not None:
+            while len(buffer) < offset + 16:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    raise ValueError("WAV stream ended inside its fmt chunk")
+                buffer += chunk
+            rate = struct.unpack("<I", buffer[offset + 12:offset + 16])[0]
+            if rate != sample_rate:
+                raise ValueError(f"Expected {sample_rate} Hz audio, got {rate} Hz")
+        offset += 8 + chunk_size + (chunk_size & 1)
+
+    rest = buffer[offset + 8:]
+    if rest:
+        yield rest
+    yield from chunks
@@ -0,0 +1,208 @@
+import gc
+import itertools
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+import torch
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Set in the parent right before forking so every worker inherits the loaded model
+_worker_cloner = None
+
+# How often the result collector checks that every worker is still alive
+WORKER_CHECK_INTERVAL = 1.0
+
+
+def _worker_main(index, tasks, results, num_threads, cpus):
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    torch.set_num_threads(num_threads)
+
+    cloner = _worker_cloner
+    # Drop values inherited from the parent; only this worker's own are sent back
+    metrics.drain()
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+
+        task_id, fn, args, kwargs = task
+        try:
+            result = fn(cloner, *args, **kwargs)
+        except Exception as e:
+            # The original exception may not survive pickling, which would break the queue
+            results.put((task_id, index, False, RuntimeError(repr(e)), metrics.drain()))
+        else:
+            results.put((task_id, index, True, result, metrics.drain()))
+
+
+class SynthesisWorkerPool:
+    """
+    Forked pool of synthesis workers sharing one loaded model copy-on-write.
+
+    The parent loads the model once; each worker is forked afterwards, so the
+    weight pages are shared until written (inference never writes them). Each
+    worker gets its own torch thread budget and, where supported, a disjoint
+    set of CPUs. Tasks go to the worker with the fewest outstanding tasks.
+    Metrics a worker records while running a task are merged into the parent.
+    A worker that dies (e.g. OOM-killed) fails its pending tasks and is
+    replaced by a fresh fork.
+    """
+
+    def __init__(self, cloner, num_workers=None, threads_per_worker=None, pin_cpus=True):
+        """
+        Args:
+            cloner: Loaded ``VoiceCloner`` to share with the workers.
+            num_workers (int): Worker processes; defaults to one per 4 cores.
+            threads_per_worker (int): Torch intra-op threads per worker; defaults
+                to an even split of the available cores.
+            pin_cpus (bool): Pin each worker to its own slice of CPUs (Linux only).
+        """
+        cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+        self.num_workers = num_workers or max(1, len(cpus) // 4)
+        self.threads_per_worker = threads_per_worker or max(1, len(cpus) // self.num_workers)
+
+        self._ctx = mp.get_context("fork")
+        self._cloner = cloner
+        self._cpus = cpus
+        self._pin_cpus = pin_cpus
+        self._results = self._ctx.Queue()
+        self._tasks = [None] * self.num_workers
+        self._processes = [None] * self.num_workers
+        self._outstanding = [0] * self.num_workers
+        # task id -> (worker index, future)
+        self._futures = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._closed = False
+
+        for index in range(self.num_workers):
+            self._spawn(index)
+
+        self._collector = threading.Thread(target=self._collect, name="synthesis-results", daemon=True)
+        self._collector.start()
+        logger.info(f"Started {self.num_workers} synthesis workers with {self.threads_per_worker} threads each")
+
+    def _spawn(self, index):
+        global _worker_cloner
+
+        worker_cpus = None
+        if self._pin_cpus and len(self._cpus) >= self.num_workers * self.threads_per_worker:
+            worker_cpus = set(self._cpus[index * self.threads_per_worker:(index + 1) * self.threads_per_worker])
+
+        # Respawns fork while other threads may hold the inference, VAD, metrics or
+        # cache locks; those modules replace their locks in the child via os.register_at_fork.
+        # A fresh queue, so tasks queued for a dead worker are never picked up twice
+        tasks = self._ctx.Queue()
+        _worker_cloner = self._cloner
+        # Keep the GC from touching (and so un-sharing) every inherited object in the workers
+        gc.collect()
+        gc.freeze()
+        try:
+            process = self._ctx.Process(
+                target=_worker_main,
+                args=(index, tasks, self._results, self.threads_per_worker, worker_cpus),
+                name=f"synthesis-worker-{index}",
+                daemon=True,
+            )
+            process.start()
+        finally:
+            gc.unfreeze()
+            _worker_cloner = None
+        self._tasks[index] = tasks
+        self._processes[index] = process
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Runs ``fn(cloner, *args, **kwargs)`` on the least-loaded worker.
+
+        ``fn`` must be a module-level function so it can be sent to the worker.
+
+        Returns:
+            Future: Resolved with the return value of ``fn``.
+        """
+        future = Future()
+        with self._lock:
+            index = min(range(self.num_workers), key=lambda i: self._outstanding[i])
+            task_id = next(self._ids)
+            self._outstanding[index] += 1
+            self._futures[task_id] = (index, future)
+            self._tasks[index].put((task_id, fn, args, kwargs))
+        return future
+
+    def broadcast(self, fn, *args, **kwargs):
+        """Runs ``fn`` once on every worker and waits for all of them."""
+        futures = []
+        for index in range(self.num_workers):
+            future = Future()
+            with self._lock:
+                task_id = next(self._ids)
+                self._outstanding[index] += 1
+                self._futures[task_id] = (index, future)
+                self._tasks[index].put((task_id, fn, args, kwargs))
+            futures.append(future)
+        return [future.result() for future in futures]
+
+    def load(self):
+        with self._lock:
+            return list(self._outstanding)
+
+    def _collect(self):
+        while True:
+            try:
+                message = self._results.get(timeout=WORKER_CHECK_INTERVAL)
+            except queue.Empty:
+                self._check_workers()
+                continue
+            if message is None:
+                return
+
+            task_id, index, ok, payload, measurements = message
+            # Stage timings recorded in the worker, so /metrics in this process covers them
+            metrics.merge(measurements)
+            with self._lock:
+                entry = self._futures.pop(task_id, None)
+                if entry is None:
+                    # Already failed when its worker was found dead
+                    continue
+                self._outstanding[index] -= 1
+            future = entry[1]
+            if ok:
+                future.set_result(payload)
+            else:
+                future.set_exception(payload)
+            self._check_workers()
+
+    def _check_workers(self):
+        for index, process in enumerate(self._processes):
+            if process.is_alive() or self._closed:
+                continue
+
+            with self._lock:
+                lost = [task_id for task_id, (worker, _) in self._futures.items() if worker == index]
+                futures = [self._futures.pop(task_id)[1] for task_id in lost]
+                self._outstanding[index] = 0
+                logger.error(
+                    f"Synthesis worker {index} exited with code {process.exitcode}; "
+                    f"failing {len(futures)} pending task(s) and starting a replacement"
+                )
+                self._spawn(index)
+
+            for future in futures:
+                future.set_exception(RuntimeError(f"Synthesis worker {index} exited with code {process.exitcode}"))
+
+    def shutdown(self):
+        self._closed = True
+        for tasks in self._tasks:
+            tasks.put(None)
+        for process in self._processes:
+            process.join()
+        self._results.put(None)
+        self._collector.join()
@@ -0,0 +1,173 @@
+import os
+import queue
+import threading
+
+import librosa
+import numpy as np
+import torch
+
+# Rate XTTS resamples reference audio to before running its conditioning encoders
+CONDITIONING_SAMPLE_RATE = 22050
+
+# XTTS is not re-entrant: each call stores its text prefix on the shared GPT
+# module (store_prefix_emb), so overlapping calls on one model corrupt each
+# other. Every model call in the process goes through this lock; parallelism
+# comes from SynthesisWorkerPool processes, each with its own copy. Reentrant
+# so helpers (e.g. warmup) can nest.
+INFERENCE_LOCK = threading.RLock()
+
+_END = object()
+
+
+def _reset_lock_after_fork():
+    # A worker forked while another thread is mid-inference would inherit the lock held forever
+    global INFERENCE_LOCK
+    INFERENCE_LOCK = threading.RLock()
+
+
+os.register_at_fork(after_in_child=_reset_lock_after_fork)
+
+
+def compute_conditioning(tts_model, audio_paths):
+    """
+    Runs the XTTS speaker encoders over one or more reference files.
+
+    Args:
+        tts_model: The underlying ``Xtts`` model (``TTS.synthesizer.tts_model``).
+        audio_paths (list[str]): Reference audio files for the speaker.
+
+    Returns:
+        tuple: ``(gpt_cond_latent, speaker_embedding)`` tensors.
+    """
+    config = tts_model.config
+    with INFERENCE_LOCK:
+        return tts_model.get_conditioning_latents(
+            audio_path=audio_paths,
+            gpt_cond_len=config.gpt_cond_len,
+            gpt_cond_chunk_len=config.gpt_cond_chunk_len,
+            max_ref_length=config.max_ref_len,
+            sound_norm_refs=config.sound_norm_refs,
+        )
+
+
+def compute_conditioning_from_array(tts_model, audio, sr):
+    """
+    In-memory equivalent of ``compute_conditioning`` for a single reference.
+
+    Follows ``Xtts.get_conditioning_latents`` step for step, but takes a
+    waveform instead of a path so no intermediate file is needed.
+
+    Args:
+        tts_model: The underlying ``Xtts`` model.
+        audio (np.ndarray): Float mono reference waveform.
+        sr (int): Sample rate of ``audio``.
+
+    Returns:
+        tuple: ``(gpt_cond_latent, speaker_embedding)`` tensors.
+    """
+    config = tts_model.config
+    load_sr = CONDITIONING_SAMPLE_RATE
+    if sr != load_sr:
+        audio = librosa.resample(audio, orig_sr=sr, target_sr=load_sr)
+
+    device = next(tts_model.parameters()).device
+    reference = torch.from_numpy(np.clip(audio, -1.0, 1.0).astype(np.float32)).unsqueeze(0)
+    reference = reference[:, : load_sr * config.max_ref_len].to(device)
+    if config.sound_norm_refs:
+        reference = (reference / torch.abs(reference).max()) * 0.75
+
+    with INFERENCE_LOCK, torch.inference_mode():
+        speaker_embedding = tts_model.get_speaker_embedding(reference, load_sr)
+        gpt_cond_latent = tts_model.get_gpt_cond_latents(
+            reference, load_sr, length=config.gpt_cond_len, chunk_length=config.gpt_cond_chunk_len
+        )
+    return gpt_cond_latent, speaker_embedding
+
+
+def synthesize(tts_model, text, language, gpt_cond_latent, speaker_embedding, speed=1.0):
+    """
+    Synthesizes speech from precomputed speaker conditioning.
+
+    Mirrors the sampling settings ``tts_to_file`` uses, minus the per-call
+    conditioning pass.
+
+    Returns:
+        tuple: ``(waveform, sample_rate)`` with a float32 mono waveform.
+    """
+    config = tts_model.config
+    with INFERENCE_LOCK, torch.inference_mode():
+        output = tts_model.inference(
+            text,
+            language,
+            gpt_cond_latent,
+            speaker_embedding,
+            temperature=config.temperature,
+            length_penalty=config.length_penalty,
+            repetition_penalty=config.repetition_penalty,
+            top_k=config.top_k,
+            top_p=config.top_p,
+            speed=speed,
+            enable_text_splitting=True,
+        )
+    return np.asarray(output["wav"], dtype=np.float32), config.audio.output_sample_rate
+
+
+def synthesize_stream(tts_model, text, language, gpt_cond_latent, speaker_embedding, speed=1.0):
+    """
+    Yields float32 waveform chunks as XTTS produces them.
+
+    Uses ``inference_stream`` when the model provides it and otherwise falls
+    back to yielding the whole utterance as a single chunk.
+    """
+    if not hasattr(tts_model, "inference_stream"):
+        wav, _ = synthesize(tts_model, text, language, gpt_cond_latent, speaker_embedding, speed=speed)
+        yield wav
+        return
+
+    config = tts_model.config
+    chunks = queue.Queue()
+
+    def generate():
+        # Runs under the lock until the utterance is done, independent of how fast
+        # the caller consumes it, so a slow client never holds up other requests
+        try:
+            with INFERENCE_LOCK, torch.inference_mode():
+                for chunk in tts_model.inference_stream(
+                    text,
+                    language,
+                    gpt_cond_latent,
+                    speaker_embedding,
+                    temperature=config.temperature,
+                    length_penalty=config.length_penalty,
+                    repetition_penalty=config.repetition_penalty,
+                    top_k=config.top_k,
+                    top_p=config.top_p,
+                    speed=speed,
+                ):
+                    chunks.put(chunk.detach().cpu().numpy().astype(np.float32).reshape(-1))
+        except Exception as e:
+            chunks.put(e)
+        finally:
+            chunks.put(_END)
+
+    threading.Thread(target=generate, name="xtts-stream", daemon=True).start()
+    while True:
+        chunk = chunks.get()
+        if chunk is _END:
+            return
+        if isinstance(chunk, Exception):
+            raise chunk
+        yield chunk
+
+
+def warmup(tts_model, text="Warming up the voice model.", language="en"):
+    """
+    Runs one short conditioning pass and synthesis so lazy initialization,
+    allocator growth and kernel selection happen before real traffic.
+    """
+    sr = CONDITIONING_SAMPLE_RATE
+    t = np.arange(sr * 3) / sr
+    # A voiced-ish harmonic tone with a syllable-rate envelope is enough to exercise the encoders
+    reference = (0.3 * np.sin(2 * np.pi * 140 * t) + 0.1 * np.sin(2 * np.pi * 280 * t)) * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t))
+    gpt_cond_latent, speaker_embedding = compute_conditioning_from_array(tts_model, reference.astype(np.float32), sr)
+    synthesize(tts_model, text, language, gpt_cond_latent, speaker_embedding)
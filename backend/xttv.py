@@ -1,16 +1,17 @@
 import torch
-from TTS.api import TTS
-import librosa
-import soundfile as sf
 import numpy as np
-from pydub import AudioSegment
-from pydub.silence import split_on_silence
-import noisereduce as nr
-import os
+import time
 from TTS.tts.configs.xtts_config import XttsConfig
 from TTS.tts.models.xtts import XttsAudioConfig, XttsArgs
 from TTS.config.shared_configs import BaseDatasetConfig
 import logging
+from model_loader import (
+    XTTS_INTEROP_THREADS, XTTS_MMAP, XTTS_MODEL_PATH, XTTS_NUM_THREADS, XTTS_QUANTIZE, load_xtts
+)
+from speaker_cache import SpeakerCache
+from audio_buffer import AudioBuffer, iter_blocks, peak
+import preprocessing
+import xtts_utils
 
 
 
@@ -23,89 +24,122 @@ torch.serialization.add_safe_globals([
 ])
 
 logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(_name_)
+logger = logging.getLogger(__name__)
 
 class VoiceCloner:
-    def _init_(self):
+    def __init__(self, speaker_cache_dir="speaker_cache", model_path=XTTS_MODEL_PATH, mmap=XTTS_MMAP,
+                 quantize=XTTS_QUANTIZE, num_threads=XTTS_NUM_THREADS, interop_threads=XTTS_INTEROP_THREADS,
+                 warmup=False):
         
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         logger.info(f"Using device: {self.device}")
         
         try:
-            self.model = TTS("tts_models/multilingual/multi-dataset/xtts_v2", 
-                           progress_bar=True).to(self.device)
+            self.tts_model = load_xtts(
+                self.device,
+                model_path=model_path,
+                mmap=mmap,
+                quantize=quantize,
+                num_threads=num_threads,
+                interop_threads=interop_threads
+            )
             logger.info("Model loaded successfully")
         except Exception as e:
             logger.error(f"Error loading model: {str(e)}")
             raise
 
+        self.speaker_cache = SpeakerCache(
+            speaker_cache_dir, device=self.device, namespace=f"xttv-denoise-v{preprocessing.PREPROCESS_VERSION}"
+        )
+
+        if warmup:
+            self.warmup()
+        self.ready = True
+
+    def warmup(self):
+        """Runs a short synthesis so the first real request does not pay cold-start costs."""
+        start = time.perf_counter()
+        xtts_utils.warmup(self.tts_model)
+        logger.info(f"Warm-up finished in {time.perf_counter() - start:.2f}s")
+
+    def get_speaker_latents(self, speaker_wav):
+        return self.speaker_cache.get_or_compute(speaker_wav, self._compute_speaker_latents)
+
+    def _compute_speaker_latents(self, speaker_wav):
+        reference = self.preprocess_audio(speaker_wav)
+        return xtts_utils.compute_conditioning_from_array(self.tts_model, reference.samples, reference.sr)
+
     def preprocess_audio(self, input_wav, min_silence_len=500, silence_thresh=-40):
+        """
+        Cleans a reference recording block by block, entirely in memory.
+
+        A first pass finds the file's peak so every block is normalized to the
+        same gain; the second pass applies spectral-gating noise reduction and
+        trims long silences one block at a time, stopping once ``max_ref_len``
+        seconds are collected since XTTS conditioning ignores the rest. No
+        intermediate files are written and memory stays bounded however long
+        the recording is.
+
+        Returns:
+            AudioBuffer: The processed reference.
+        """
         try:
             logger.info(f"Processing audio file: {input_wav}")
-            
-            # Load and normalize audio
-            audio, sr = librosa.load(input_wav, sr=None)
-            normalized_audio = librosa.util.normalize(audio)
-            
-            # Apply noise reduction
-            reduced_noise = nr.reduce_noise(y=normalized_audio, sr=sr)
-            
-            # Save temporary file using soundfile
-            temp_path = "temp_processed.wav"
-            sf.write(temp_path, reduced_noise, sr)
-            
-            # Process with pydub
-            audio_segment = AudioSegment.from_wav(temp_path)
-            
-            # Remove silence
-            chunks = split_on_silence(
-                audio_segment,
-                min_silence_len=min_silence_len,
-                silence_thresh=silence_thresh,
-                keep_silence=100
-            )
-            
-            # Combine processed chunks
-            processed_audio = sum(chunks)
-            
-            # Export final processed audio
-            processed_path = f"processed_{os.path.basename(input_wav)}"
-            processed_audio.export(processed_path, format="wav")
-            
-            # Cleanup
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-                
-            logger.info(f"Audio preprocessing completed: {processed_path}")
-            return processed_path
+
+            # Pass 1: global peak, so block-wise normalization matches normalizing the whole file
+            file_peak = peak(input_wav, block_seconds=preprocessing.REFERENCE_BLOCK_SECONDS)
+            gain = 1.0 / file_peak if file_peak else 1.0
+
+            # Pass 2: normalize, denoise and trim each block until the reference is long enough
+            pieces, collected, max_frames, sr = [], 0, None, None
+            for block in iter_blocks(input_wav, block_seconds=preprocessing.REFERENCE_BLOCK_SECONDS):
+                sr = block.sr
+                max_frames = int(self.tts_model.config.max_ref_len * sr)
+                normalized_audio = block.samples * np.float32(gain)
+
+                # Apply noise reduction
+                reduced_noise = preprocessing.spectral_gate(normalized_audio, sr)
+
+                # Remove silence
+                processed_block = preprocessing.trim_silence(
+                    reduced_noise,
+                    sr,
+                    min_silence_len=min_silence_len,
+                    silence_thresh=silence_thresh,
+                    keep_silence=100
+                )
+                pieces.append(processed_block)
+                collected += len(processed_block)
+                if collected >= max_frames:
+                    break
+
+            if not pieces:
+                raise ValueError(f"No audio in {input_wav}")
+
+            processed_audio = np.concatenate(pieces)[:max_frames]
+            logger.info(f"Audio preprocessing completed: {len(processed_audio) / sr:.1f}s of audio")
+            return AudioBuffer(processed_audio, sr)
             
         except Exception as e:
             logger.error(f"Error in audio preprocessing: {str(e)}")
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
             raise
 
     def clone_voice(self, text, speaker_wav, output_wav, language="en", speed=1.0):
         """Enhanced voice cloning with speed control"""
         try:
-            # Preprocess reference audio
-            processed_speaker = self.preprocess_audio(speaker_wav)
+            # Reference conditioning is cached per speaker file contents
+            gpt_cond_latent, speaker_embedding = self.get_speaker_latents(speaker_wav)
             
             # Generate speech with cloned voice
-            self.model.tts_to_file(
-                text=text,
-                speaker_wav=processed_speaker,
-                language="hi",
-                file_path=output_wav,
+            wav, sample_rate = xtts_utils.synthesize(
+                self.tts_model,
+                text,
+                "hi",
+                gpt_cond_latent,
+                speaker_embedding,
                 speed=speed,
-                emotion="happy",
-                
-
-                
             )
-            
-            if processed_speaker != speaker_wav:
-                os.remove(processed_speaker)
+            AudioBuffer(wav, sample_rate).write(output_wav)
                 
             return True
             
@@ -130,5 +164,5 @@ def main():
     else:
         print("Voice cloning failed.")
 
-if _name_ == "_main_":
+if __name__ == "__main__":
     main()
\ No newline at end of file